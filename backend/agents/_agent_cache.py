@@ -0,0 +1,57 @@
+"""
+Reuse of agents created by previous runs.
+
+Agents persist in the Azure AI project, so creating one per run leaves a new
+copy behind every time. Each agent is tagged with a hash of its
+configuration (instructions, tools and tool resources) in its metadata, and
+an existing agent with the same name, model and hash is reused.
+"""
+
+import hashlib
+import json
+
+CONFIG_HASH_KEY = "config_sha256"
+
+
+def _as_dict(value):
+    return value.as_dict() if hasattr(value, "as_dict") else value
+
+
+def _config_hash(instructions: str, tools, tool_resources) -> str:
+    config = {
+        "instructions": instructions,
+        "tools": [_as_dict(tool) for tool in tools],
+        "tool_resources": _as_dict(tool_resources),
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _find_agent(project_client, name: str, model: str, config_hash: str):
+    after = None
+    while True:
+        page = project_client.agents.list_agents(limit=100, after=after)
+        for agent in page.data:
+            if agent.name == name and agent.model == model and (agent.metadata or {}).get(CONFIG_HASH_KEY) == config_hash:
+                return agent
+        if not page.has_more:
+            return None
+        after = page.last_id
+
+
+def get_or_create_agent(project_client, name: str, model: str, instructions: str, tools, tool_resources):
+    """Return an agent with this configuration, creating it only if none exists yet."""
+    config_hash = _config_hash(instructions, tools, tool_resources)
+
+    agent = _find_agent(project_client, name, model, config_hash)
+    if agent is not None:
+        print(f"♻️ Reusing agent: {agent.id}")
+        return agent
+
+    return project_client.agents.create_agent(
+        model=model,
+        name=name,
+        instructions=instructions,
+        tools=tools,
+        tool_resources=tool_resources,
+        metadata={CONFIG_HASH_KEY: config_hash}
+    )
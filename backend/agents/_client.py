@@ -0,0 +1,25 @@
+"""
+Shared Azure AI Project client for the agents.
+"""
+
+import functools
+import os
+
+from azure.identity import DefaultAzureCredential
+from azure.ai.projects import AIProjectClient
+
+
+@functools.lru_cache(maxsize=1)
+def get_project_client() -> AIProjectClient:
+    """Return the process-wide AIProjectClient.
+
+    Building the client once keeps a single credential (and its token cache)
+    and a single HTTP connection pool for every agent in the process.
+    """
+    return AIProjectClient(
+        endpoint=os.getenv("AZURE_AI_ENDPOINT"),
+        subscription_id=os.getenv("AZURE_SUBSCRIPTION_ID"),
+        resource_group_name=os.getenv("AZURE_RESOURCE_GROUP"),
+        project_name=os.getenv("AZURE_PROJECT_NAME"),
+        credential=DefaultAzureCredential()
+    )
@@ -0,0 +1,43 @@
+"""
+On-disk cache of agent responses.
+
+Responses are stored as one JSON file per key under .cache/responses and
+expire after a TTL. Keys are content hashes of everything that determines the
+answer (model, instructions, indexed files and conversation so far), so
+identical reruns are served from disk instead of the model.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+
+import orjson
+
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "responses"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+def make_key(*parts: str) -> str:
+    """Build a cache key from the inputs that determine a response."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def get_response(key: str, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+    """Return the cached response for ``key``, or None if missing or expired."""
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime > ttl_seconds:
+            return None
+        return orjson.loads(path.read_bytes())["response"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def set_response(key: str, response: str):
+    """Store ``response`` under ``key``."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    (CACHE_DIR / f"{key}.json").write_bytes(orjson.dumps({"response": response}))
@@ -0,0 +1,102 @@
+"""
+Agent run helpers shared by the Azure AI agents.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from azure.ai.projects.models import AgentStreamEvent, MessageDeltaChunk, ThreadMessage, ThreadMessageOptions, ThreadRun
+
+
+def post_messages(project_client, thread_id, messages) -> str:
+    """Add ``messages`` (dicts with ``role`` and ``content``) to a thread and return its ID.
+
+    With no ``thread_id`` the thread is created together with its first
+    messages in one call, instead of create_thread followed by create_message.
+    """
+    if thread_id is None:
+        return project_client.agents.create_thread(
+            messages=[ThreadMessageOptions(**message) for message in messages]
+        ).id
+    for message in messages:
+        project_client.agents.create_message(thread_id=thread_id, **message)
+    return thread_id
+
+
+def latest_assistant_message(project_client, thread_id):
+    """Fetch the most recent message on a thread if the assistant wrote it."""
+    messages = project_client.agents.list_messages(thread_id=thread_id, limit=1, order="desc")
+    if messages.data and messages.data[0].role == "assistant":
+        return messages.data[0]
+    return None
+
+
+def stream_run(project_client, thread_id, agent_id, echo: bool = False, **run_kwargs):
+    """Run an agent with streaming so text is available as it is generated.
+
+    Returns ``(run, message)``: the final run state and the completed
+    assistant message. With ``echo`` set, text deltas are written to stdout
+    as they arrive instead of after the whole response has finished.
+    """
+    run = None
+    message = None
+    message_id = None
+    with project_client.agents.create_stream(thread_id=thread_id, agent_id=agent_id, **run_kwargs) as stream:
+        for event_type, event_data, _ in stream:
+            if isinstance(event_data, MessageDeltaChunk):
+                message_id = event_data.id
+                if echo:
+                    print(event_data.text, end="", flush=True)
+            elif isinstance(event_data, ThreadMessage):
+                if event_data.role == "assistant":
+                    message_id = event_data.id
+                    if event_data.status in ("completed", "incomplete"):
+                        message = event_data
+            elif isinstance(event_data, ThreadRun):
+                run = event_data
+            elif event_type == AgentStreamEvent.ERROR:
+                print(f"   ❌ Stream error: {event_data}")
+    if echo:
+        print()
+    if run is not None and run.status == "incomplete":
+        print(f"   ⚠️ Response truncated: {run.incomplete_details}")
+
+    # The final message normally arrives on the stream. If it did not, fetch the message this
+    # run produced by ID; only list the thread when the stream never identified one.
+    # Runs that hit max_completion_tokens end as "incomplete" but still carry a partial answer.
+    if message is None and run is not None and run.status in ("completed", "incomplete"):
+        if message_id:
+            message = project_client.agents.get_message(thread_id=thread_id, message_id=message_id)
+        else:
+            message = latest_assistant_message(project_client, thread_id)
+
+    return run, message
+
+
+def save_images(project_client, images, images_dir):
+    """Download ``(file_id, file_name)`` pairs into ``images_dir`` in parallel.
+
+    Returns the names of the files that were saved, in input order.
+    """
+    if not images:
+        return []
+
+    def _save_one(file_id, file_name):
+        project_client.agents.save_file(
+            file_id=file_id,
+            file_name=file_name,
+            target_dir=str(images_dir)
+        )
+        return file_name
+
+    saved = set()
+    with ThreadPoolExecutor(max_workers=min(8, len(images))) as executor:
+        futures = [executor.submit(_save_one, file_id, file_name) for file_id, file_name in images]
+        for future in as_completed(futures):
+            try:
+                file_name = future.result()
+            except Exception as e:
+                print(f"   ⚠️ Image save failed: {e}")
+            else:
+                saved.add(file_name)
+                print(f"   💾 Saved: {file_name}")
+    return [file_name for _, file_name in images if file_name in saved]
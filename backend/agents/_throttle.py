@@ -0,0 +1,85 @@
+"""
+Request throttling shared by the Azure AI agents.
+"""
+
+import random
+import threading
+import time
+
+from azure.core.exceptions import HttpResponseError
+
+RATE_LIMIT_ERROR_CODE = "rate_limit_exceeded"
+
+
+class RateLimiter:
+    """Thread-safe token bucket that spaces out agent runs.
+
+    Up to ``burst`` runs may start immediately; after that, tokens refill at
+    ``runs_per_minute`` so concurrent workers stay within the service quota.
+    """
+
+    def __init__(self, runs_per_minute: float, burst: int = 1):
+        self.interval = 60.0 / runs_per_minute
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a run may start."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.interval
+            time.sleep(wait)
+
+
+def _retry_after_seconds(error: HttpResponseError):
+    """Return the Retry-After delay from a throttled response, if present."""
+    if error.response is None:
+        return None
+    retry_after = error.response.headers.get("Retry-After")
+    try:
+        return float(retry_after) if retry_after else None
+    except ValueError:
+        return None
+
+
+def _backoff_delay(base_delay: float, attempt: int) -> float:
+    """Exponential backoff with +/-50% jitter."""
+    return base_delay * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+def run_with_backoff(start_run, max_retries: int = 5, base_delay: float = 2.0, limiter: RateLimiter = None):
+    """Start an agent run, retrying only when Azure reports throttling.
+
+    ``start_run`` is a zero-argument callable returning ``(run, message)``.
+    Throttling surfaces either as an HTTP 429 or as a failed run whose
+    ``last_error.code`` is ``rate_limit_exceeded``. The ``Retry-After``
+    header is honoured when present; otherwise the delay backs off
+    exponentially with jitter, so runs throttled together do not retry together.
+    Successful runs return immediately with no idle wait. With ``limiter``
+    set, every attempt, retries included, first takes a token from it.
+    """
+    for attempt in range(max_retries):
+        is_last_attempt = attempt == max_retries - 1
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            run, message = start_run()
+        except HttpResponseError as e:
+            if e.status_code != 429 or is_last_attempt:
+                raise
+            delay = _retry_after_seconds(e) or _backoff_delay(base_delay, attempt)
+        else:
+            last_error = getattr(run, "last_error", None)
+            if run is None or run.status != "failed" or getattr(last_error, "code", None) != RATE_LIMIT_ERROR_CODE or is_last_attempt:
+                return run, message
+            delay = _backoff_delay(base_delay, attempt)
+        print(f"   ⏳ Rate limited - retrying in {delay:.0f}s ({attempt + 1}/{max_retries})")
+        time.sleep(delay)
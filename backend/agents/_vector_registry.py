@@ -0,0 +1,119 @@
+"""
+Content-addressed registry of uploaded agent files and vector stores.
+
+Uploading and indexing the same documents on every run is the slowest part
+of agent start-up. .cache/vector_registry.json maps each file's content hash
+to its uploaded file ID, and each set of file hashes to the vector store that
+indexes it. All agents share the registry, so a document is uploaded once no
+matter how many agents use it, and a file set is indexed once no matter which
+agent asked for it first. Entries are reused while they still exist in Azure.
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import orjson
+from azure.ai.projects.models import FilePurpose
+from azure.core.exceptions import ResourceNotFoundError
+
+REGISTRY_FILE = Path(__file__).parent.parent / ".cache" / "vector_registry.json"
+
+_registry_lock = threading.Lock()
+
+
+def _content_hash(path: Path) -> str:
+    """SHA-256 of a file, read in 64KB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_registry() -> dict:
+    if not REGISTRY_FILE.exists():
+        return {"files": {}, "vector_stores": {}}
+    try:
+        registry = orjson.loads(REGISTRY_FILE.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {"files": {}, "vector_stores": {}}
+    registry.setdefault("files", {})
+    registry.setdefault("vector_stores", {})
+    return registry
+
+
+def _update_registry(files: dict, vector_stores: dict):
+    """Merge new entries into the registry on disk."""
+    with _registry_lock:
+        registry = _load_registry()
+        registry["files"].update(files)
+        registry["vector_stores"].update(vector_stores)
+        REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        REGISTRY_FILE.write_bytes(orjson.dumps(registry, option=orjson.OPT_INDENT_2))
+
+
+def _file_exists(project_client, file_id: str) -> bool:
+    try:
+        project_client.agents.get_file(file_id)
+        return True
+    except ResourceNotFoundError:
+        return False
+
+
+def _vector_store_ready(project_client, vector_store_id: str) -> bool:
+    try:
+        return project_client.agents.get_vector_store(vector_store_id).status == "completed"
+    except ResourceNotFoundError:
+        return False
+
+
+def ensure_vector_store(project_client, file_paths, name: str) -> str:
+    """Return the ID of a vector store indexing exactly ``file_paths``.
+
+    The store is looked up by the sorted content hashes of the files, so any
+    agent asking for the same documents gets the same store. Otherwise files
+    already uploaded (by any agent) are reused, the rest are uploaded in
+    parallel, and a new store named ``name`` is created.
+    """
+    file_paths = [Path(p) for p in file_paths]
+    file_hashes = [_content_hash(p) for p in file_paths]
+    store_key = ",".join(sorted(file_hashes))
+
+    with _registry_lock:
+        registry = _load_registry()
+
+    vector_store_id = registry["vector_stores"].get(store_key)
+    if vector_store_id and _vector_store_ready(project_client, vector_store_id):
+        print(f"♻️ Reusing vector store: {vector_store_id}")
+        return vector_store_id
+
+    file_ids = {
+        file_hash: registry["files"][file_hash]
+        for file_hash in set(file_hashes)
+        if file_hash in registry["files"] and _file_exists(project_client, registry["files"][file_hash])
+    }
+
+    to_upload = {file_hash: path for path, file_hash in zip(file_paths, file_hashes) if file_hash not in file_ids}
+    if to_upload:
+        with ThreadPoolExecutor(max_workers=len(to_upload)) as executor:
+            futures = {
+                file_hash: executor.submit(
+                    project_client.agents.upload_file_and_poll,
+                    file_path=str(path),
+                    purpose=FilePurpose.AGENTS
+                )
+                for file_hash, path in to_upload.items()
+            }
+            for file_hash, future in futures.items():
+                file_ids[file_hash] = future.result().id
+                print(f"📤 Uploaded: {to_upload[file_hash].name} ({file_ids[file_hash]})")
+
+    vector_store = project_client.agents.create_vector_store_and_poll(
+        file_ids=list(dict.fromkeys(file_ids[file_hash] for file_hash in file_hashes)),
+        name=name
+    )
+
+    _update_registry(file_ids, {store_key: vector_store.id})
+    return vector_store.id
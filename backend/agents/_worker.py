@@ -0,0 +1,44 @@
+"""
+Long-lived agent worker process.
+
+Started by the orchestrator with ``python -m agents._worker``. Reads one agent
+name per line on stdin, runs that agent in-process and then prints a
+``DONE_MARKER`` line with the outcome. The interpreter, the Azure SDK imports
+and the agent modules are loaded once per worker instead of once per run.
+The worker exits when stdin is closed.
+"""
+
+import importlib
+import sys
+import traceback
+
+DONE_MARKER = "__AGENT_DONE__"
+
+# Agent name -> (module, entry point). An entry point returning False counts as a failure.
+ENTRYPOINTS = {
+    "stock_analyst": ("agents.stock_analyst", "generate_report"),
+    "investment_report": ("agents.investment_report_agent", "generate_report"),
+    "compliance": ("agents.compliance_agent", "run_compliance_check"),
+}
+
+
+def main():
+    for line in sys.stdin:
+        agent_name = line.strip()
+        if not agent_name:
+            continue
+
+        status = "success"
+        try:
+            module_name, entrypoint = ENTRYPOINTS[agent_name]
+            if getattr(importlib.import_module(module_name), entrypoint)() is False:
+                status = "error"
+        except Exception:
+            traceback.print_exc(file=sys.stdout)
+            status = "error"
+
+        print(f"{DONE_MARKER} {status}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,35 +9,53 @@ INPUT FILES (3 required):
 3. stock_report.json
 """
 
-import json
+import functools
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
-from azure.ai.projects.models import FilePurpose, FileSearchTool, ToolResources, FileSearchToolResource
+from azure.ai.projects.models import FileSearchTool, ToolResources, FileSearchToolResource, MessageTextContent
+
+# Allow running as a script (python agents/compliance_agent.py) as well as a package import
+sys.path.append(str(Path(__file__).parent.parent))
+from agents._agent_cache import get_or_create_agent
+from agents._client import get_project_client
+from agents._response_cache import get_response, make_key, set_response
+from agents._runs import post_messages, stream_run
+from agents._throttle import RateLimiter, run_with_backoff
+from agents._vector_registry import ensure_vector_store
 
 # Configuration - Use environment variables (no hardcoded fallbacks)
-ENDPOINT = os.getenv("AZURE_AI_ENDPOINT")
-SUBSCRIPTION_ID = os.getenv("AZURE_SUBSCRIPTION_ID")
-RESOURCE_GROUP = os.getenv("AZURE_RESOURCE_GROUP")
-PROJECT_NAME = os.getenv("AZURE_PROJECT_NAME")
 MODEL_DEPLOYMENT = os.getenv("AZURE_MODEL_DEPLOYMENT", "gpt-4o-mini")
+RUNS_PER_MINUTE = float(os.getenv("AZURE_AGENT_RUNS_PER_MINUTE", "12"))
+
+# Upper bound on tokens generated per compliance section (sections are long-form)
+MAX_COMPLETION_TOKENS = 1500
 
-INSTRUCTIONS_DIR = Path(__file__).parent.parent / "instructions"
+# Sections 1-3 can run concurrently; the limiter keeps run starts (and retries) within the
+# service quota, with a burst below those three so the fallback path is spaced out
+RUN_LIMITER = RateLimiter(RUNS_PER_MINUTE, burst=2)
 
+BASE_DIR = Path(__file__).parent.parent
+INSTRUCTIONS_DIR = BASE_DIR / "instructions"
+DATA_DIR = BASE_DIR / "data"
 
+
+@functools.lru_cache(maxsize=16)
 def load_instructions(file_name: str) -> str:
-    """Load agent instructions from instructions directory."""
+    """Load agent instructions from instructions directory (read once per file)."""
     instructions_path = INSTRUCTIONS_DIR / file_name
-    if not instructions_path.exists():
-        raise FileNotFoundError(f"Missing instructions file: {instructions_path}")
-    return instructions_path.read_text(encoding="utf-8")
+    try:
+        return instructions_path.read_bytes().decode("utf-8")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Missing instructions file: {instructions_path}") from None
 
 # Validate required environment variables
 REQUIRED_ENV_VARS = ["AZURE_AI_ENDPOINT", "AZURE_SUBSCRIPTION_ID", "AZURE_RESOURCE_GROUP", "AZURE_PROJECT_NAME"]
@@ -45,6 +63,101 @@ missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
 if missing_vars:
     raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
+# Instructions are static per deployment; read them once at import
+AGENT_INSTRUCTIONS = load_instructions("compliance_agent/instructions.txt")
+
+# Section prompts. Sections 1-3 only read the indexed files; section 4 builds on their answers.
+SECTION_1_QUERY = """SECTION 1 — Read & Summarize Valuation Rules
+
+Extract from valuationpolicy_processed.json:
+1. Definition of traded / thinly traded / non-traded securities
+2. Price source rules (NSE/BSE requirements)
+3. Exceptional events list
+4. Committee review / deviation rules
+
+Output as clean paragraphs with bullet points. List JSON keys used."""
+
+SECTION_2_QUERY = """SECTION 2 — Trading Classification
+
+Using stock_report.json and the traded-security thresholds in valuationpolicy_processed.json:
+- Extract 30-day total traded value, volume, avg daily volume
+- Extract exchange name and timestamp
+- Determine if security meets traded criteria
+
+Output as paragraph with cited JSON keys."""
+
+SECTION_3_QUERY = """SECTION 3 — Exceptional Events Evaluation
+
+Check the exceptional events listed in valuationpolicy_processed.json against:
+- company_analysis_output.json (financial risks)
+- stock_report.json (trading data)
+
+For each event, state: triggered (YES/NO/POSSIBLE) with evidence."""
+
+SECTION_4_TASK = """Based on Sections 1-3, provide:
+- Decision: ACCEPT VALUATION / REVIEW REQUIRED / ESCALATE / NON-COMPLIANT
+- Justification (3-4 sentences citing evidence)
+- Mandatory fixes (if any)"""
+
+# Output keys, in section order
+SECTION_KEYS = [
+    "section_1_policy_rules",
+    "section_2_trading_classification",
+    "section_3_exceptional_events",
+    "section_4_final_recommendation",
+]
+
+SECTION_TITLES = [
+    "SECTION 1: VALUATION POLICY RULES",
+    "SECTION 2: TRADING CLASSIFICATION",
+    "SECTION 3: EXCEPTIONAL EVENTS",
+    "SECTION 4: FINAL RECOMMENDATION",
+]
+
+# All four sections in one run: one retrieval pass and one round trip instead of four
+BATCHED_QUERY = f"""Complete all four compliance sections below in one answer.
+
+Return ONLY a JSON object with exactly these string keys: {", ".join(SECTION_KEYS)}.
+Each value is that section's full answer as markdown text.
+
+{SECTION_1_QUERY}
+
+{SECTION_2_QUERY}
+
+{SECTION_3_QUERY}
+
+SECTION 4 — Final Recommendation
+
+{SECTION_4_TASK}"""
+
+
+# Top-level keys each input file must have for the compliance sections to be answerable
+REQUIRED_INPUT_KEYS = {
+    "valuationpolicy_processed.json": ("chunks",),
+    "company_analysis_output.json": ("recommendation",),
+    "stock_report.json": ("sections",),
+}
+
+
+def check_input_file(file_path: Path):
+    """Return why an input file is unusable (missing, empty, invalid JSON, missing keys), or None"""
+    try:
+        blob = file_path.read_bytes()
+    except FileNotFoundError:
+        return "Missing"
+    if not blob.strip():
+        return "Empty"
+    try:
+        data = orjson.loads(blob)
+    except orjson.JSONDecodeError as e:
+        return f"Invalid JSON ({e})"
+    if not isinstance(data, dict):
+        return "Not a JSON object"
+    missing = [key for key in REQUIRED_INPUT_KEYS.get(file_path.name, ()) if key not in data]
+    if missing:
+        return f"Missing keys {', '.join(missing)}"
+    return None
+
 
 def create_compliance_agent():
     """Create Azure AI agent with access to all compliance files"""
@@ -53,188 +166,213 @@ def create_compliance_agent():
     print("="*70)
     print("\n📂 Initializing AI Agent...\n")
     
-    base_dir = Path(__file__).parent.parent
-    data_dir = base_dir / "data"
-    
     # Input files
-    valuation_policy_file = data_dir / "valuationpolicy_processed.json"
-    company_analysis_file = data_dir / "company_analysis_output.json"
-    stock_report_file = data_dir / "stock_report.json"
+    valuation_policy_file = DATA_DIR / "valuationpolicy_processed.json"
+    company_analysis_file = DATA_DIR / "company_analysis_output.json"
+    stock_report_file = DATA_DIR / "stock_report.json"
     
-    # Check files exist
+    # Check files exist and parse, so a bad input fails here instead of after upload and a model run
     for file_path in [valuation_policy_file, company_analysis_file, stock_report_file]:
-        if not file_path.exists():
-            print(f"❌ Missing: {file_path.name}")
+        problem = check_input_file(file_path)
+        if problem:
+            print(f"❌ {problem}: {file_path.name}")
             return None, None, None
         print(f"✅ Found: {file_path.name}")
     
     # Create Azure AI client
-    project_client = AIProjectClient(
-        endpoint=ENDPOINT,
-        subscription_id=SUBSCRIPTION_ID,
-        resource_group_name=RESOURCE_GROUP,
-        project_name=PROJECT_NAME,
-        credential=DefaultAzureCredential()
-    )
+    project_client = get_project_client()
     
-    # Upload all three files
-    print(f"\n📤 Uploading files to Azure AI...")
-    file_ids = []
-    for file_path in [valuation_policy_file, company_analysis_file, stock_report_file]:
-        uploaded_file = project_client.agents.upload_file_and_poll(
-            file_path=str(file_path),
-            purpose=FilePurpose.AGENTS
-        )
-        file_ids.append(uploaded_file.id)
-        print(f"   ✅ {file_path.name}")
-    
-    # Create vector store
-    print(f"\n📚 Creating vector store...")
-    vector_store = project_client.agents.create_vector_store_and_poll(
-        file_ids=file_ids,
+    # Upload files (in parallel) and index them, reusing the previous run's store when unchanged
+    print(f"\n📚 Preparing vector store...")
+    vector_store_id = ensure_vector_store(
+        project_client,
+        [valuation_policy_file, company_analysis_file, stock_report_file],
         name="PMS_Compliance_VS"
     )
-    print(f"   ✅ Vector Store ID: {vector_store.id}")
+    print(f"   ✅ Vector Store ID: {vector_store_id}")
     
-    agent_instructions = load_instructions("compliance_agent/instructions.txt")
-
     # Create agent
-    file_search_tool = FileSearchTool(vector_store_ids=[vector_store.id])
+    file_search_tool = FileSearchTool(vector_store_ids=[vector_store_id])
     tool_resources = ToolResources(
-        file_search=FileSearchToolResource(vector_store_ids=[vector_store.id])
+        file_search=FileSearchToolResource(vector_store_ids=[vector_store_id])
     )
     
-    print(f"\n🤖 Creating AI agent...")
-    agent = project_client.agents.create_agent(
-        model=MODEL_DEPLOYMENT,
+    print(f"\n🤖 Preparing AI agent...")
+    agent = get_or_create_agent(
+        project_client,
         name="pms-compliance-evaluator",
-        instructions=agent_instructions,
+        model=MODEL_DEPLOYMENT,
+        instructions=AGENT_INSTRUCTIONS,
         tools=file_search_tool.definitions,
         tool_resources=tool_resources
     )
     print(f"   ✅ Agent ID: {agent.id}")
     
-    thread = project_client.agents.create_thread()
-    print(f"   ✅ Thread ID: {thread.id}\n")
-    
-    return project_client, agent, thread
+    return project_client, agent, new_conversation()
 
 
-def ask_agent(project_client, agent, thread, query: str) -> str:
-    """Ask agent a question and get response"""
-    project_client.agents.create_message(
-        thread_id=thread.id,
-        role="user",
-        content=query
-    )
-    
-    run = project_client.agents.create_and_process_run(
-        thread_id=thread.id,
-        agent_id=agent.id
+def new_conversation() -> dict:
+    """Start an empty conversation with the agent
+
+    The thread is created together with the first query that needs the model.
+    Exchanges are kept in order; answers served from the response cache are not
+    posted to the thread until an uncached query needs them as context.
+    """
+    return {"thread_id": None, "exchanges": []}
+
+
+def ask_agent(project_client, agent, conversation, query: str, echo: bool = False,
+              max_completion_tokens: int = MAX_COMPLETION_TOKENS, is_usable=None) -> str:
+    """Ask agent a question and get response (streamed to stdout when echo is set)
+
+    Responses are cached on disk, keyed by the model, instructions, indexed
+    files and the conversation so far, so unchanged reruns skip the model.
+    With ``is_usable`` set, only responses it accepts are cached or served
+    from the cache.
+    """
+    exchanges = conversation["exchanges"]
+    cache_key = make_key(
+        MODEL_DEPLOYMENT,
+        AGENT_INSTRUCTIONS,
+        *agent.tool_resources.file_search.vector_store_ids,
+        *(text for exchange in exchanges for text in (exchange["query"], exchange["response"])),
+        query
     )
     
-    if run.status == "failed":
-        print(f"❌ Agent failed: {run.last_error}")
-        return ""
+    cached = get_response(cache_key)
+    if cached is not None and (is_usable is None or is_usable(cached)):
+        exchanges.append({"query": query, "response": cached, "posted": False})
+        if echo:
+            print(cached)
+        return cached
     
-    messages = project_client.agents.list_messages(thread_id=thread.id)
+    # Replay cached answers so this query sees the same conversation as an uncached run
+    messages = []
+    for exchange in exchanges:
+        if not exchange["posted"]:
+            messages.append({"role": "user", "content": exchange["query"]})
+            messages.append({"role": "assistant", "content": exchange["response"]})
+            exchange["posted"] = True
+    messages.append({"role": "user", "content": query})
     
-    for msg in messages.data:
-        if msg.role == "assistant":
-            for item in msg.content:
-                if hasattr(item, "text"):
-                    return item.text.value
+    is_new_thread = conversation["thread_id"] is None
+    conversation["thread_id"] = post_messages(project_client, conversation["thread_id"], messages)
+    if is_new_thread:
+        print(f"   ✅ Thread ID: {conversation['thread_id']}\n")
     
-    return ""
-
-
-def run_compliance_check():
-    """Main compliance check workflow - 4 structured sections"""
-    project_client, agent, thread = create_compliance_agent()
+    run, message = run_with_backoff(
+        lambda: stream_run(
+            project_client, conversation["thread_id"], agent.id, echo=echo,
+            max_completion_tokens=max_completion_tokens
+        ),
+        limiter=RUN_LIMITER
+    )
     
-    if not project_client:
-        print("\n❌ Failed to create agent. Aborting.")
-        return False
+    response = ""
+    if run is None or run.status == "failed":
+        print(f"❌ Agent failed: {run.last_error if run else 'no run status received'}")
+    elif message:
+        for item in message.content:
+            if isinstance(item, MessageTextContent):
+                response = item.text.value
+                break
     
-    print("="*70)
-    print("🔍 RUNNING COMPLIANCE ANALYSIS (4 SECTIONS)")
-    print("="*70 + "\n")
-    
-    # SECTION 1: Read Valuation Rules
-    print("📋 SECTION 1: Reading Valuation Policy Rules...\n")
-    section1_query = """SECTION 1 — Read & Summarize Valuation Rules
+    exchanges.append({"query": query, "response": response, "posted": True})
+    # Only complete answers are cached; truncated or failed runs are retried next time
+    if response and run.status == "completed" and (is_usable is None or is_usable(response)):
+        set_response(cache_key, response)
+    return response
 
-Extract from valuationpolicy_processed.json:
-1. Definition of traded / thinly traded / non-traded securities
-2. Price source rules (NSE/BSE requirements)
-3. Exceptional events list
-4. Committee review / deviation rules
 
-Output as clean paragraphs with bullet points. List JSON keys used."""
+def _parse_sections(response: str):
+    """Parse a batched answer into {section key: text}, or None if it is not usable"""
+    start, end = response.find("{"), response.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        parsed = orjson.loads(response[start:end + 1])
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    if not all(isinstance(parsed.get(key), str) and parsed[key].strip() for key in SECTION_KEYS):
+        return None
+    return {key: parsed[key] for key in SECTION_KEYS}
 
-    section1_response = ask_agent(project_client, agent, thread, section1_query)
-    print("="*70)
-    print("SECTION 1: VALUATION POLICY RULES")
-    print("="*70)
-    print(section1_response)
-    
-    # SECTION 2: Trading Classification
-    print("\n📋 SECTION 2: Analyzing Trading Classification...\n")
-    section2_query = """SECTION 2 — Trading Classification
 
-Using stock_report.json and thresholds from Section 1:
-- Extract 30-day total traded value, volume, avg daily volume
-- Extract exchange name and timestamp
-- Determine if security meets traded criteria
+def ask_sections_batched(project_client, agent):
+    """Ask for all four sections in one run; returns None if the answer is not valid JSON"""
+    response = ask_agent(
+        project_client, agent, new_conversation(), BATCHED_QUERY,
+        max_completion_tokens=MAX_COMPLETION_TOKENS * len(SECTION_KEYS),
+        # An unparseable answer would otherwise be replayed, and fall back, on every rerun
+        is_usable=lambda text: _parse_sections(text) is not None
+    )
+    return _parse_sections(response)
 
-Output as paragraph with cited JSON keys."""
 
-    section2_response = ask_agent(project_client, agent, thread, section2_query)
-    print("="*70)
-    print("SECTION 2: TRADING CLASSIFICATION")
-    print("="*70)
-    print(section2_response)
+def ask_sections_separately(project_client, agent, conversation):
+    """Ask each section on its own: sections 1-3 in parallel, then section 4"""
+    # Sections 1-3 only read the indexed files, so each runs on its own thread in parallel.
+    # Section 4 continues the Section 1 conversation with the other two answers pasted in.
+    parallel_queries = [
+        (SECTION_1_QUERY, conversation),
+        (SECTION_2_QUERY, new_conversation()),
+        (SECTION_3_QUERY, new_conversation()),
+    ]
+    with ThreadPoolExecutor(max_workers=len(parallel_queries)) as executor:
+        futures = [
+            executor.submit(ask_agent, project_client, agent, section_conversation, query)
+            for query, section_conversation in parallel_queries
+        ]
+        section1_response, section2_response, section3_response = [future.result() for future in futures]
     
-    # SECTION 3: Exceptional Events
-    print("\n📋 SECTION 3: Evaluating Exceptional Events...\n")
-    section3_query = """SECTION 3 — Exceptional Events Evaluation
+    section4_query = f"""SECTION 4 — Final Recommendation
 
-Check policy-listed exceptional events against:
-- company_analysis_output.json (financial risks)
-- stock_report.json (trading data)
+SECTION 2 FINDINGS:
+{section2_response}
 
-For each event, state: triggered (YES/NO/POSSIBLE) with evidence."""
+SECTION 3 FINDINGS:
+{section3_response}
 
-    section3_response = ask_agent(project_client, agent, thread, section3_query)
-    print("="*70)
-    print("SECTION 3: EXCEPTIONAL EVENTS")
-    print("="*70)
-    print(section3_response)
+{SECTION_4_TASK}"""
+    section4_response = ask_agent(project_client, agent, conversation, section4_query)
     
-    # SECTION 4: Final Recommendation
-    print("\n📋 SECTION 4: Generating Final Recommendation...\n")
-    section4_query = """SECTION 4 — Final Recommendation
+    return dict(zip(SECTION_KEYS, (section1_response, section2_response, section3_response, section4_response)))
 
-Based on Sections 1-3, provide:
-- Decision: ACCEPT VALUATION / REVIEW REQUIRED / ESCALATE / NON-COMPLIANT
-- Justification (3-4 sentences citing evidence)
-- Mandatory fixes (if any)"""
 
-    section4_response = ask_agent(project_client, agent, thread, section4_query)
-    print("="*70)
-    print("SECTION 4: FINAL RECOMMENDATION")
+def run_compliance_check():
+    """Main compliance check workflow - 4 structured sections"""
+    project_client, agent, conversation = create_compliance_agent()
+    
+    if not project_client:
+        print("\n❌ Failed to create agent. Aborting.")
+        return False
+    
     print("="*70)
-    print(section4_response)
+    print("🔍 RUNNING COMPLIANCE ANALYSIS (4 SECTIONS)")
+    print("="*70 + "\n")
+    
+    print("📋 SECTIONS 1-4: Requesting all sections in one structured answer...\n")
+    sections = ask_sections_batched(project_client, agent)
+    if sections is None:
+        print("⚠️ Structured answer could not be parsed - asking section by section\n")
+        sections = ask_sections_separately(project_client, agent, conversation)
+    
+    for title, key in zip(SECTION_TITLES, SECTION_KEYS):
+        print("="*70)
+        print(title)
+        print("="*70)
+        print(sections[key])
     
     # Save outputs
-    base_dir = Path(__file__).parent.parent
-    data_dir = base_dir / "data"
+    generated_at = datetime.now().isoformat()
     
     findings_json = {
-        "section_1_policy_rules": section1_response,
-        "section_2_trading_classification": section2_response,
-        "section_3_exceptional_events": section3_response,
-        "generated_at": datetime.now().isoformat(),
+        "section_1_policy_rules": sections["section_1_policy_rules"],
+        "section_2_trading_classification": sections["section_2_trading_classification"],
+        "section_3_exceptional_events": sections["section_3_exceptional_events"],
+        "generated_at": generated_at,
         "source_files": [
             "valuationpolicy_processed.json",
             "company_analysis_output.json",
@@ -243,15 +381,21 @@ Based on Sections 1-3, provide:
     }
     
     recommendation_json = {
-        "section_4_final_recommendation": section4_response,
-        "generated_at": datetime.now().isoformat()
+        "section_4_final_recommendation": sections["section_4_final_recommendation"],
+        "generated_at": generated_at
     }
     
-    findings_output = data_dir / "compliance_findings.json"
-    recommendation_output = data_dir / "compliance_recommendation.json"
+    findings_output = DATA_DIR / "compliance_findings.json"
+    recommendation_output = DATA_DIR / "compliance_recommendation.json"
     
-    findings_output.write_text(json.dumps(findings_json, indent=2), encoding="utf-8")
-    recommendation_output.write_text(json.dumps(recommendation_json, indent=2), encoding="utf-8")
+    # Write both outputs concurrently; result() re-raises any write error
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        writes = [
+            executor.submit(findings_output.write_bytes, orjson.dumps(findings_json, option=orjson.OPT_INDENT_2)),
+            executor.submit(recommendation_output.write_bytes, orjson.dumps(recommendation_json, option=orjson.OPT_INDENT_2))
+        ]
+        for write in writes:
+            write.result()
     
     print("\n💾 Outputs saved:")
     print(f"   - {findings_output.name}")
@@ -4,36 +4,50 @@ Investment Report with Financial Dashboards
 Template-based structure for Azure AI deployment
 """
 
-import json
+import functools
 import os
-import time
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
-from azure.ai.projects.models import FilePurpose, FileSearchTool, CodeInterpreterTool
+from azure.ai.projects.models import (
+    FileSearchTool, CodeInterpreterTool, ToolResources, FileSearchToolResource, CodeInterpreterToolResource,
+    MessageTextContent, MessageImageFileContent
+)
+
+# Allow running as a script (python agents/investment_report_agent.py) as well as a package import
+sys.path.append(str(Path(__file__).parent.parent))
+from agents._agent_cache import get_or_create_agent
+from agents._client import get_project_client
+from agents._response_cache import get_response, make_key, set_response
+from agents._runs import post_messages, save_images, stream_run
+from agents._throttle import RateLimiter, run_with_backoff
+from agents._vector_registry import ensure_vector_store
 
 # Configuration - Use environment variables (no hardcoded fallbacks)
-ENDPOINT = os.getenv("AZURE_AI_ENDPOINT")
-SUBSCRIPTION_ID = os.getenv("AZURE_SUBSCRIPTION_ID")
-RESOURCE_GROUP = os.getenv("AZURE_RESOURCE_GROUP")
-PROJECT_NAME = os.getenv("AZURE_PROJECT_NAME")
 MODEL_DEPLOYMENT = os.getenv("AZURE_MODEL_DEPLOYMENT", "gpt-4o-mini")
+RUNS_PER_MINUTE = float(os.getenv("AZURE_AGENT_RUNS_PER_MINUTE", "12"))
+
+# Keeps section run starts (and their retries) within the service quota
+RUN_LIMITER = RateLimiter(RUNS_PER_MINUTE)
 
 INSTRUCTIONS_DIR = Path(__file__).parent.parent / "instructions"
 
 
+@functools.lru_cache(maxsize=16)
 def load_instructions(file_name: str) -> str:
-    """Load agent instructions from instructions directory."""
+    """Load agent instructions from instructions directory (read once per file)."""
     instructions_path = INSTRUCTIONS_DIR / file_name
-    if not instructions_path.exists():
-        raise FileNotFoundError(f"Missing instructions file: {instructions_path}")
-    return instructions_path.read_text(encoding="utf-8")
+    try:
+        return instructions_path.read_bytes().decode("utf-8")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Missing instructions file: {instructions_path}") from None
 
 # Validate required environment variables
 REQUIRED_ENV_VARS = ["AZURE_AI_ENDPOINT", "AZURE_SUBSCRIPTION_ID", "AZURE_RESOURCE_GROUP", "AZURE_PROJECT_NAME"]
@@ -41,8 +55,13 @@ missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
 if missing_vars:
     raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
-# Data file path
-INVESTMENT_DOCUMENT = Path(__file__).parent.parent / "data" / "investmentproposal_processed.json"
+# Instructions are static per deployment; read them once at import
+AGENT_INSTRUCTIONS = load_instructions("investment_report_agent/instructions.txt")
+
+# Data file paths
+DATA_DIR = Path(__file__).parent.parent / "data"
+IMAGES_DIR = DATA_DIR / "images"
+INVESTMENT_DOCUMENT = DATA_DIR / "investmentproposal_processed.json"
 
 # Dashboard configurations
 DASHBOARDS = {
@@ -86,11 +105,21 @@ Save as dashboard_valuation_risk.png."""
     }
 }
 
+# Every run starts with the agent instructions, so the static dashboard specs live there:
+# all sections then share one long, identical prompt prefix that the service can cache,
+# and each section message only names the dashboard it needs.
+AGENT_PROMPT_PREFIX = (
+    AGENT_INSTRUCTIONS
+    + "\n\nDASHBOARD SPECIFICATIONS (create a dashboard only when a section asks for it):\n\n"
+    + "\n\n".join(f"### {key}\n{spec['prompt']}" for key, spec in DASHBOARDS.items())
+)
+
 # Report sections
 REPORT_SECTIONS = {
     "executive_summary": {
         "name": "Executive Summary",
         "dashboard": None,
+        "max_tokens": 500,
         "prompt": """Return a 4-5 line analytical paragraph including:
 - Business intro, FY24 & FY25P revenue, EBITDA and margins
 - Stock metrics: 30-day return %, volatility %, avg daily volume
@@ -99,6 +128,7 @@ REPORT_SECTIONS = {
     "financial_performance": {
         "name": "Financial Performance",
         "dashboard": "financial_overview",
+        "max_tokens": 3000,
         "prompt": """After generating dashboard, return 4-5 line paragraph:
 - Revenue FY24 & FY25P, EBITDA, Interest Coverage
 - Operating CF vs Capex analysis
@@ -107,6 +137,7 @@ REPORT_SECTIONS = {
     "balance_debt": {
         "name": "Balance Sheet & Debt",
         "dashboard": "debt_liquidity",
+        "max_tokens": 3000,
         "prompt": """After creating dashboard, return 4-5 line paragraph:
 - Total Assets, Total Debt, Net Worth, Debt-to-Equity
 - Short-term debt concentration and liquidity
@@ -115,6 +146,7 @@ REPORT_SECTIONS = {
     "operational_performance": {
         "name": "Operational Performance",
         "dashboard": "operations_capacity",
+        "max_tokens": 3000,
         "prompt": """After producing dashboard, return 4-5 line paragraph:
 - Passenger traffic FY24 and FY25P with growth %
 - Airport capacity utilization for Delhi and Hyderabad
@@ -123,6 +155,7 @@ REPORT_SECTIONS = {
     "projects_funding": {
         "name": "Projects & Funding",
         "dashboard": "projects_funding",
+        "max_tokens": 3000,
         "prompt": """After generating dashboard, return 4-5 line paragraph:
 - Total Capex pipeline and top project amounts
 - Funding Gap KPI and execution risk
@@ -131,6 +164,7 @@ REPORT_SECTIONS = {
     "valuation_risk": {
         "name": "Valuation & Risk",
         "dashboard": "valuation_risk",
+        "max_tokens": 3000,
         "prompt": """After creating dashboard, return 4-line insight:
 - EV/EBITDA, P/B, Market Cap with valuation concern
 - Top-2 risk drivers
@@ -139,6 +173,7 @@ REPORT_SECTIONS = {
     "governance_esg": {
         "name": "Governance & ESG",
         "dashboard": None,
+        "max_tokens": 500,
         "prompt": """Return 4-5 line paragraph:
 - Auditor opinion & board composition
 - Regulatory compliance status (SEBI, AERA, DGCA)
@@ -147,126 +182,153 @@ REPORT_SECTIONS = {
     }
 }
 
+# Section prompts are static, so the message sent for each section is built once here
+for _section in REPORT_SECTIONS.values():
+    _section['full_prompt'] = (
+        f"Create the {_section['dashboard']} dashboard from your specifications.\n\n---\n\n{_section['prompt']}"
+        if _section['dashboard'] else _section['prompt']
+    )
+
 
 def create_agent():
-    """Create Azure AI agent"""
-    project_client = AIProjectClient(
-        endpoint=ENDPOINT,
-        subscription_id=SUBSCRIPTION_ID,
-        resource_group_name=RESOURCE_GROUP,
-        project_name=PROJECT_NAME,
-        credential=DefaultAzureCredential()
-    )
-    
-    print(f"📊 Uploading: {INVESTMENT_DOCUMENT.name}")
-    file = project_client.agents.upload_file_and_poll(
-        file_path=str(INVESTMENT_DOCUMENT),
-        purpose=FilePurpose.AGENTS
-    )
-    print(f"✅ File: {file.id}")
-    
-    vector_store = project_client.agents.create_vector_store_and_poll(
-        file_ids=[file.id],
-        name="GMR_Investment_VS"
-    )
-    print(f"✅ Vector Store: {vector_store.id}")
+    """Create the Azure AI agents for the report
+
+    Returns ``(project_client, agents, conversation)``. ``agents`` maps "chart" to an
+    agent with code interpreter and the dashboard specs, for sections that draw a
+    dashboard, and "text" to a file-search-only agent for the rest. Both search the
+    same vector store and take turns on one thread.
+    """
+    project_client = get_project_client()
     
-    from azure.ai.projects.models import ToolResources, FileSearchToolResource, CodeInterpreterToolResource
+    print(f"📊 Indexing: {INVESTMENT_DOCUMENT.name}")
+    vector_store_id = ensure_vector_store(project_client, [INVESTMENT_DOCUMENT], name="GMR_Investment_VS")
+    print(f"✅ Vector Store: {vector_store_id}")
     
-    file_search_tool = FileSearchTool(vector_store_ids=[vector_store.id])
+    file_search_tool = FileSearchTool(vector_store_ids=[vector_store_id])
     code_interpreter_tool = CodeInterpreterTool()
-    all_tools = file_search_tool.definitions + code_interpreter_tool.definitions
     
-    tool_resources = ToolResources(
-        file_search=FileSearchToolResource(vector_store_ids=[vector_store.id]),
-        code_interpreter=CodeInterpreterToolResource()
+    chart_agent = get_or_create_agent(
+        project_client,
+        name="gmr-investment-report-agent",
+        model=MODEL_DEPLOYMENT,
+        instructions=AGENT_PROMPT_PREFIX,
+        tools=file_search_tool.definitions + code_interpreter_tool.definitions,
+        tool_resources=ToolResources(
+            file_search=FileSearchToolResource(vector_store_ids=[vector_store_id]),
+            code_interpreter=CodeInterpreterToolResource()
+        )
     )
+    print(f"✅ Chart agent: {chart_agent.id}")
     
-    agent = project_client.agents.create_agent(
+    text_agent = get_or_create_agent(
+        project_client,
+        name="gmr-investment-report-text-agent",
         model=MODEL_DEPLOYMENT,
-        name="gmr-investment-report-agent",
-        instructions=load_instructions("investment_report_agent/instructions.txt"),
-        tools=all_tools,
-        tool_resources=tool_resources
+        instructions=AGENT_INSTRUCTIONS,
+        tools=file_search_tool.definitions,
+        tool_resources=ToolResources(
+            file_search=FileSearchToolResource(vector_store_ids=[vector_store_id])
+        )
     )
-    print(f"✅ Agent: {agent.id}")
+    print(f"✅ Text agent: {text_agent.id}")
     
-    thread = project_client.agents.create_thread()
-    print(f"✅ Thread: {thread.id}\n")
+    # The thread is created together with the first section that needs the model.
+    # Sections served from the response cache are posted as context only when a
+    # later uncached section needs them.
+    conversation = {"thread_id": None, "exchanges": []}
     
-    return project_client, agent, thread
+    return project_client, {"chart": chart_agent, "text": text_agent}, conversation
+
 
+def generate_section(project_client, agents, conversation, section_key, image_saver):
+    """Generate one report section
 
-def generate_section(project_client, agent, thread, section_key):
-    """Generate one report section"""
+    Images are downloaded on ``image_saver`` (an executor) while the next
+    section is generated; the caller waits for it before finishing the report.
+    """
     section = REPORT_SECTIONS[section_key]
     print(f"\n{'='*70}")
     print(f"📝 {section['name']}")
     print('='*70)
     
-    full_prompt = section['prompt']
-    if section.get('dashboard'):
-        dashboard_spec = DASHBOARDS[section['dashboard']]
-        full_prompt = f"{dashboard_spec['prompt']}\n\n---\n\n{section['prompt']}"
-        print(f"   📊 Dashboard: {dashboard_spec['file']}")
+    full_prompt = section['full_prompt']
+    if section['dashboard']:
+        print(f"   📊 Dashboard: {DASHBOARDS[section['dashboard']]['file']}")
+        agent, instructions = agents["chart"], AGENT_PROMPT_PREFIX
+    else:
+        agent, instructions = agents["text"], AGENT_INSTRUCTIONS
     
-    project_client.agents.create_message(
-        thread_id=thread.id,
-        role="user",
-        content=full_prompt
+    # Unchanged reruns are served from disk; dashboard images keep their file names across runs
+    exchanges = conversation["exchanges"]
+    cache_key = make_key(
+        MODEL_DEPLOYMENT,
+        instructions,
+        *agent.tool_resources.file_search.vector_store_ids,
+        *(text for exchange in exchanges for text in (exchange["query"], exchange["response"])),
+        full_prompt
     )
+    cached = get_response(cache_key)
+    if cached is not None:
+        exchanges.append({"query": full_prompt, "response": cached, "posted": False})
+        print(f"   ♻️ Cached response")
+        return f"\n## {section['name']}\n\n{cached}\n"
+    
+    # Replay cached sections so this one sees the same conversation as an uncached run
+    messages = []
+    for exchange in exchanges:
+        if not exchange["posted"]:
+            messages.append({"role": "user", "content": exchange["query"]})
+            messages.append({"role": "assistant", "content": exchange["response"]})
+            exchange["posted"] = True
+    messages.append({"role": "user", "content": full_prompt})
+    
+    is_new_thread = conversation["thread_id"] is None
+    conversation["thread_id"] = post_messages(project_client, conversation["thread_id"], messages)
+    if is_new_thread:
+        print(f"✅ Thread: {conversation['thread_id']}")
     
-    run = project_client.agents.create_and_process_run(
-        thread_id=thread.id,
-        agent_id=agent.id
+    print(f"\n📄 Agent Response:")
+    print("-" * 70)
+    run, message = run_with_backoff(
+        lambda: stream_run(
+            project_client, conversation["thread_id"], agent.id, echo=True,
+            max_completion_tokens=section['max_tokens']
+        ),
+        limiter=RUN_LIMITER
     )
+    print("-" * 70)
     
-    if run.status == "failed":
-        print(f"   ❌ Failed: {run.last_error}")
+    if run is None or run.status == "failed":
+        print(f"   ❌ Failed: {run.last_error if run else 'no run status received'}")
+        exchanges.append({"query": full_prompt, "response": "", "posted": True})
         return f"\n## {section['name']}\n\n*Section generation failed*\n"
     
-    messages = project_client.agents.list_messages(thread_id=thread.id)
-    
     content = ""
     images = []
     
-    for msg in messages.data:
-        if msg.role == "assistant":
-            for item in msg.content:
-                if hasattr(item, "text"):
-                    content = item.text.value
-                elif hasattr(item, "image_file"):
-                    images.append(item.image_file.file_id)
-                elif hasattr(item, "image"):
-                    images.append(item.image.file_id)
-            if content:
-                break
-    
-    if content:
-        print(f"\n📄 Agent Response:")
-        print("-" * 70)
-        print(content[:500] + "..." if len(content) > 500 else content)
-        print("-" * 70)
+    for item in message.content if message else []:
+        if isinstance(item, MessageTextContent):
+            content = item.text.value
+        elif isinstance(item, MessageImageFileContent):
+            images.append(item.image_file.file_id)
     
-    # Save images
-    images_dir = Path(__file__).parent.parent / "data" / "images"
-    images_dir.mkdir(parents=True, exist_ok=True)
+    # Save images in the background; the next section does not depend on them
+    image_files = [
+        (img_id, f"{section_key}_{idx}.png" if len(images) > 1 else f"{section_key}.png")
+        for idx, img_id in enumerate(images, 1)
+    ]
+    saving = image_saver.submit(save_images, project_client, image_files, IMAGES_DIR)
     
-    saved_images = []
-    for idx, img_id in enumerate(images, 1):
-        try:
-            img_filename = f"{section_key}_{idx}.png" if len(images) > 1 else f"{section_key}.png"
-            project_client.agents.save_file(
-                file_id=img_id,
-                file_name=img_filename,
-                target_dir=str(images_dir)
-            )
-            saved_images.append(img_filename)
-            print(f"   💾 Saved: {img_filename}")
-        except Exception as e:
-            print(f"   ⚠️ Image save failed: {e}")
+    print(f"   ✅ Complete ({len(image_files)} images saving)")
     
-    print(f"   ✅ Complete ({len(saved_images)} images)")
+    exchanges.append({"query": full_prompt, "response": content, "posted": True})
+    # Only complete sections are cached, once all their images are saved;
+    # truncated runs and lost images are retried next time
+    if content and run.status == "completed":
+        def _cache_when_saved(future):
+            if not future.exception() and len(future.result()) == len(image_files):
+                set_response(cache_key, content)
+        saving.add_done_callback(_cache_when_saved)
     
     return f"\n## {section['name']}\n\n{content}\n"
 
@@ -277,22 +339,30 @@ def generate_report():
     print("GMR AIRPORTS - INVESTMENT REPORT GENERATOR")
     print("="*70 + "\n")
     
-    project_client, agent, thread = create_agent()
+    project_client, agents, conversation = create_agent()
+    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    
+    started = datetime.now()
+    timestamp = started.strftime("%B %d, %Y")
+    timestamp_str = started.strftime('%Y%m%d_%H%M%S')
+    output_path = DATA_DIR / f"GMR_Investment_Report_{timestamp_str}.md"
     
-    timestamp = datetime.now().strftime("%B %d, %Y")
-    report = f"""# GMR Airports Limited - Investment Analysis
+    # Sections go to disk as they are generated instead of being held for one final write
+    with open(output_path, "w", encoding="utf-8") as report_file:
+        report_file.write(f"""# GMR Airports Limited - Investment Analysis
 **Mutual Fund Investment Report | {timestamp}**
 
 ---
-"""
-    
-    for section_key in REPORT_SECTIONS.keys():
-        section_content = generate_section(project_client, agent, thread, section_key)
-        report += section_content
-        report += "\n---\n"
-        time.sleep(25)  # Rate limit delay
-    
-    report += """
+""")
+        
+        # Leaving the executor waits for the last images to finish saving
+        with ThreadPoolExecutor(max_workers=1) as image_saver:
+            for section_key in REPORT_SECTIONS.keys():
+                report_file.write(generate_section(project_client, agents, conversation, section_key, image_saver))
+                report_file.write("\n---\n")
+                report_file.flush()
+        
+        report_file.write("""
 ## Investment Recommendation
 
 **HOLD for existing investors / WAIT for new investors**
@@ -302,14 +372,7 @@ GMR offers long-term growth potential tied to India's aviation expansion, but ne
 ---
 
 *Report generated by Azure AI Investment Analysis Agent*
-"""
-    
-    # Save outputs
-    data_dir = Path(__file__).parent.parent / "data"
-    timestamp_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-    
-    output_path = data_dir / f"GMR_Investment_Report_{timestamp_str}.md"
-    output_path.write_text(report, encoding="utf-8")
+""")
     
     json_output = {
         "symbol": "GMRAIRPORT.NS",
@@ -331,8 +394,8 @@ GMR offers long-term growth potential tied to India's aviation expansion, but ne
         ]
     }
     
-    json_output_path = data_dir / "company_analysis_output.json"
-    json_output_path.write_text(json.dumps(json_output, indent=2), encoding="utf-8")
+    json_output_path = DATA_DIR / "company_analysis_output.json"
+    json_output_path.write_bytes(orjson.dumps(json_output, option=orjson.OPT_INDENT_2))
     
     print("="*70)
     print(f"✅ REPORT COMPLETE:")
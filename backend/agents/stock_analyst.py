@@ -4,36 +4,46 @@ Stock Analysis with 5-Panel Visualization Dashboard
 Template-based structure for Azure AI deployment
 """
 
-import json
+import functools
 import os
-import time
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
-from azure.ai.projects.models import FilePurpose, FileSearchTool, CodeInterpreterTool
+from azure.ai.projects.models import (
+    FileSearchTool, CodeInterpreterTool, ToolResources, FileSearchToolResource, CodeInterpreterToolResource,
+    MessageTextContent, MessageImageFileContent, MessageTextFilePathAnnotation
+)
+
+# Allow running as a script (python agents/stock_analyst.py) as well as a package import
+sys.path.append(str(Path(__file__).parent.parent))
+from agents._agent_cache import get_or_create_agent
+from agents._client import get_project_client
+from agents._runs import post_messages, save_images, stream_run
+from agents._throttle import RateLimiter, run_with_backoff
+from agents._vector_registry import ensure_vector_store
 
 # Configuration - Use environment variables (no hardcoded fallbacks)
-ENDPOINT = os.getenv("AZURE_AI_ENDPOINT")
-SUBSCRIPTION_ID = os.getenv("AZURE_SUBSCRIPTION_ID")
-RESOURCE_GROUP = os.getenv("AZURE_RESOURCE_GROUP")
-PROJECT_NAME = os.getenv("AZURE_PROJECT_NAME")
 MODEL_DEPLOYMENT = os.getenv("AZURE_MODEL_DEPLOYMENT", "gpt-4o-mini")
+RUNS_PER_MINUTE = float(os.getenv("AZURE_AGENT_RUNS_PER_MINUTE", "12"))
 
 INSTRUCTIONS_DIR = Path(__file__).parent.parent / "instructions"
 
 
+@functools.lru_cache(maxsize=16)
 def load_instructions(file_name: str) -> str:
-    """Load agent instructions from instructions directory."""
+    """Load agent instructions from instructions directory (read once per file)."""
     instructions_path = INSTRUCTIONS_DIR / file_name
-    if not instructions_path.exists():
-        raise FileNotFoundError(f"Missing instructions file: {instructions_path}")
-    return instructions_path.read_text(encoding="utf-8")
+    try:
+        return instructions_path.read_bytes().decode("utf-8")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Missing instructions file: {instructions_path}") from None
 
 # Validate required environment variables
 REQUIRED_ENV_VARS = ["AZURE_AI_ENDPOINT", "AZURE_SUBSCRIPTION_ID", "AZURE_RESOURCE_GROUP", "AZURE_PROJECT_NAME"]
@@ -41,8 +51,20 @@ missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
 if missing_vars:
     raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
-# Data file path
-STOCK_ANALYSIS_DOCUMENT = Path(__file__).parent.parent / "data" / "gmr_stock_analysis.json"
+# Instructions are static per deployment; read them once at import
+AGENT_INSTRUCTIONS = load_instructions("stock_analyst/instructions.txt")
+
+# Panels run concurrently; the limiter keeps run starts within the service quota.
+# The burst is below the panel count, so a report's later panels are spaced out
+RUN_LIMITER = RateLimiter(RUNS_PER_MINUTE, burst=3)
+
+# Separator for console output
+RULE = "-" * 70
+
+# Data file paths
+DATA_DIR = Path(__file__).parent.parent / "data"
+IMAGES_DIR = DATA_DIR / "images"
+STOCK_ANALYSIS_DOCUMENT = DATA_DIR / "gmr_stock_analysis.json"
 
 # Report sections configuration
 REPORT_SECTIONS_FINAL = {
@@ -54,8 +76,9 @@ REPORT_SECTIONS_FINAL = {
     },
     "executive_summary": {
         "name": "Executive Summary",
-        "dashboard": "null",
+        "dashboard": None,
         "size": {"width": 2400, "height": 200},
+        "max_tokens": 400,
         "prompt": """Generate an analytical paragraph with stock metrics including:
 - symbol, 30-day return %, volatility %, avg daily volume, total traded value, total traded volume
 - Price provenance (exchange + timestamp)
@@ -65,6 +88,7 @@ Output only the paragraph text - NO IMAGE generation for this section."""
         "name": "P1 - Price Trend & Momentum",
         "dashboard": "p1_price_trend",
         "size": {"width": 1100, "height": 800},
+        "max_tokens": 3000,
         "prompt": """Create 1100x800 panel with OHLC Candlestick chart, Volume bars, SMA lines, and text summary.
 Save as p1_price_trend.png."""
     },
@@ -72,6 +96,7 @@ Save as p1_price_trend.png."""
         "name": "P2 - Relative Performance vs Benchmarks",
         "dashboard": "p2_relative_perf",
         "size": {"width": 1100, "height": 800},
+        "max_tokens": 3000,
         "prompt": """Create 1100x800 panel with bar chart comparing 30d returns (Stock, NIFTY, SENSEX),
 Alpha visualization, and Beta/Correlation table. Save as p2_relative_perf.png."""
     },
@@ -79,6 +104,7 @@ Alpha visualization, and Beta/Correlation table. Save as p2_relative_perf.png.""
         "name": "P3 - Liquidity Profile",
         "dashboard": "p3_liquidity",
         "size": {"width": 1100, "height": 800},
+        "max_tokens": 3000,
         "prompt": """Create 1100x800 panel with volume comparison bars, KPI badges,
 high volume timeline, and liquidity table. Save as p3_liquidity.png."""
     },
@@ -86,6 +112,7 @@ high volume timeline, and liquidity table. Save as p3_liquidity.png."""
         "name": "P4 - Volatility & Drawdown",
         "dashboard": "p4_volatility",
         "size": {"width": 1100, "height": 800},
+        "max_tokens": 3000,
         "prompt": """Create 1100x800 panel with volatility gauge, max drawdown bar,
 and gap risk panel. Save as p4_volatility.png."""
     }
@@ -94,80 +121,60 @@ and gap risk panel. Save as p4_volatility.png."""
 
 def create_agent():
     """Create Azure AI agent"""
-    project_client = AIProjectClient(
-        endpoint=ENDPOINT,
-        subscription_id=SUBSCRIPTION_ID,
-        resource_group_name=RESOURCE_GROUP,
-        project_name=PROJECT_NAME,
-        credential=DefaultAzureCredential()
-    )
-    
-    print(f"📊 Uploading: {STOCK_ANALYSIS_DOCUMENT.name}")
-    file = project_client.agents.upload_file_and_poll(
-        file_path=str(STOCK_ANALYSIS_DOCUMENT),
-        purpose=FilePurpose.AGENTS
-    )
-    print(f"✅ File: {file.id}")
-    
-    vector_store = project_client.agents.create_vector_store_and_poll(
-        file_ids=[file.id],
-        name="GMR_Stock_Analysis_VS"
-    )
-    print(f"✅ Vector Store: {vector_store.id}")
+    project_client = get_project_client()
     
-    from azure.ai.projects.models import ToolResources, FileSearchToolResource, CodeInterpreterToolResource
+    print(f"📊 Indexing: {STOCK_ANALYSIS_DOCUMENT.name}")
+    vector_store_id = ensure_vector_store(project_client, [STOCK_ANALYSIS_DOCUMENT], name="GMR_Stock_Analysis_VS")
+    print(f"✅ Vector Store: {vector_store_id}")
     
-    file_search_tool = FileSearchTool(vector_store_ids=[vector_store.id])
+    file_search_tool = FileSearchTool(vector_store_ids=[vector_store_id])
     code_interpreter_tool = CodeInterpreterTool()
     all_tools = file_search_tool.definitions + code_interpreter_tool.definitions
     
     tool_resources = ToolResources(
-        file_search=FileSearchToolResource(vector_store_ids=[vector_store.id]),
+        file_search=FileSearchToolResource(vector_store_ids=[vector_store_id]),
         code_interpreter=CodeInterpreterToolResource()
     )
     
-    agent = project_client.agents.create_agent(
-        model=MODEL_DEPLOYMENT,
+    agent = get_or_create_agent(
+        project_client,
         name="gmr-stock-unified-report-agent",
-        instructions=load_instructions("stock_analyst/instructions.txt"),
+        model=MODEL_DEPLOYMENT,
+        instructions=AGENT_INSTRUCTIONS,
         tools=all_tools,
         tool_resources=tool_resources
     )
-    print(f"✅ Agent: {agent.id}")
-    
-    thread = project_client.agents.create_thread()
-    print(f"✅ Thread: {thread.id}\n")
+    print(f"✅ Agent: {agent.id}\n")
     
-    return project_client, agent, thread
+    return project_client, agent
 
 
-def generate_section(project_client, agent, thread, section_key, retry_delay=15):
-    """Generate one report section/panel"""
+def generate_section(project_client, agent, section_key):
+    """Generate one report section/panel on its own thread"""
     section = REPORT_SECTIONS_FINAL[section_key]
     print(f"\n{'='*70}")
     print(f"📝 {section['name']}")
     print('='*70)
     
-    full_prompt = section.get('prompt', '')
+    full_prompt = section['prompt']
     
-    if section.get('dashboard'):
+    if section['dashboard']:
         print(f"   📊 Dashboard: {section['dashboard']}.png")
     
-    time.sleep(retry_delay)
-    
-    project_client.agents.create_message(
-        thread_id=thread.id,
-        role="user",
-        content=full_prompt
-    )
+    # Create the panel's thread together with its prompt
+    thread_id = post_messages(project_client, None, [{"role": "user", "content": full_prompt}])
     
-    run = project_client.agents.create_and_process_run(
-        thread_id=thread.id,
-        agent_id=agent.id
+    # Panels run in parallel, so the text is not echoed as it streams in
+    run, message = run_with_backoff(
+        lambda: stream_run(
+            project_client, thread_id, agent.id,
+            max_completion_tokens=section['max_tokens']
+        ),
+        limiter=RUN_LIMITER
     )
     
-    if run.status == "failed":
-        print(f"   ❌ Failed: {run.last_error}")
+    if run is None or run.status == "failed":
+        print(f"   ❌ Failed: {run.last_error if run else 'no run status received'}")
         return f"\n## {section['name']}\n\n*Section generation failed*\n", {
             "id": section_key,
             "name": section['name'],
@@ -175,54 +182,33 @@ def generate_section(project_client, agent, thread, section_key, retry_delay=15)
             "image": None
         }
     
-    messages = project_client.agents.list_messages(thread_id=thread.id)
-    
     content = ""
     images = []
     
-    for msg in messages.data:
-        if msg.role == "assistant":
-            for item in msg.content:
-                if hasattr(item, "text"):
-                    content = item.text.value
-                    if hasattr(item.text, 'annotations'):
-                        for annotation in item.text.annotations:
-                            if hasattr(annotation, 'file_path') and hasattr(annotation.file_path, 'file_id'):
-                                images.append(annotation.file_path.file_id)
-                elif hasattr(item, "image_file"):
-                    images.append(item.image_file.file_id)
-                elif hasattr(item, "image"):
-                    images.append(item.image.file_id)
-            if content:
-                break
+    for item in message.content if message else []:
+        if isinstance(item, MessageTextContent):
+            content = item.text.value
+            for annotation in item.text.annotations or []:
+                if isinstance(annotation, MessageTextFilePathAnnotation):
+                    images.append(annotation.file_path.file_id)
+        elif isinstance(item, MessageImageFileContent):
+            images.append(item.image_file.file_id)
     
     if content:
-        print(f"\n📄 Agent Response:")
-        print("-" * 70)
-        print(content[:500] + "..." if len(content) > 500 else content)
-        print("-" * 70)
+        # One write per preview, so previews from panels running in parallel do not interleave
+        sys.stdout.write(
+            f"\n📄 Agent Response:\n{RULE}\n{content[:500]}{'...' if len(content) > 500 else ''}\n{RULE}\n"
+        )
     
     # Save images - for deployment, images go to blob storage
-    images_dir = Path(__file__).parent.parent / "data" / "images"
-    images_dir.mkdir(parents=True, exist_ok=True)
-    
-    saved_images = []
-    for idx, img_id in enumerate(images, 1):
-        try:
-            if section.get('dashboard'):
-                img_filename = f"{section['dashboard']}.png"
-            else:
-                img_filename = f"{section_key}.png"
-            
-            project_client.agents.save_file(
-                file_id=img_id,
-                file_name=img_filename,
-                target_dir=str(images_dir)
-            )
-            saved_images.append(img_filename)
-            print(f"   💾 Saved: {img_filename}")
-        except Exception as e:
-            print(f"   ⚠️ Image save failed: {e}")
+    # The same file can be referenced both inline and as an annotation; save each once,
+    # giving extra images a numbered suffix so parallel downloads never share a path
+    base_name = section['dashboard'] or section_key
+    image_files = [
+        (img_id, f"{base_name}.png" if idx == 1 else f"{base_name}_{idx}.png")
+        for idx, img_id in enumerate(dict.fromkeys(images), 1)
+    ]
+    saved_images = save_images(project_client, image_files, IMAGES_DIR)
     
     print(f"   ✅ Complete ({len(saved_images)} images)")
     
@@ -231,8 +217,8 @@ def generate_section(project_client, agent, thread, section_key, retry_delay=15)
         "name": section['name'],
         "summary": content.strip(),
         "image": saved_images[0] if saved_images else None,
-        "dashboard": section.get('dashboard'),
-        "size": section.get('size')
+        "dashboard": section['dashboard'],
+        "size": section['size']
     }
     
     return f"\n## {section['name']}\n\n{content}\n", section_data
@@ -244,10 +230,9 @@ def generate_report():
     print("GMR AIRPORTS - STOCK REPORT GENERATOR")
     print("="*70 + "\n")
     
-    project_client, agent, thread = create_agent()
+    project_client, agent = create_agent()
     
-    images_dir = Path(__file__).parent.parent / "data" / "images"
-    images_dir.mkdir(parents=True, exist_ok=True)
+    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
     
     panel_sections = [
         "executive_summary",
@@ -257,11 +242,15 @@ def generate_report():
         "panel_p4_volatility"
     ]
     
-    report_sections_data = []
+    # Panels are independent prompts, so each runs on its own thread in parallel
+    with ThreadPoolExecutor(max_workers=len(panel_sections)) as executor:
+        futures = {
+            section_key: executor.submit(generate_section, project_client, agent, section_key)
+            for section_key in panel_sections
+        }
+        sections_by_key = {key: future.result()[1] for key, future in futures.items()}
     
-    for section_key in panel_sections:
-        _, section_data = generate_section(project_client, agent, thread, section_key, retry_delay=15)
-        report_sections_data.append(section_data)
+    report_sections_data = [sections_by_key[key] for key in panel_sections]
     
     # Create JSON report
     json_report = {
@@ -277,15 +266,15 @@ def generate_report():
     }
     
     # Save JSON report
-    json_output_path = Path(__file__).parent.parent / "data" / "stock_report.json"
-    json_output_path.write_text(json.dumps(json_report, indent=2), encoding="utf-8")
+    json_output_path = DATA_DIR / "stock_report.json"
+    json_output_path.write_bytes(orjson.dumps(json_report, option=orjson.OPT_INDENT_2))
     
     print("="*70)
     print(f"✅ STOCK REPORT COMPLETE")
     print(f"   📄 JSON: {json_output_path.name}")
     print("="*70)
     
-    return images_dir
+    return IMAGES_DIR
 
 
 if __name__ == "__main__":
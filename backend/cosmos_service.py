@@ -3,12 +3,17 @@ Cosmos DB Service for Investment Research Analysis
 Handles analysis session persistence using Azure Managed Identity
 """
 
+import base64
+import importlib.util
 import os
-import json
+import time
+import traceback
 from datetime import datetime
-from typing import List, Dict, Optional
-from azure.cosmos import CosmosClient
-from azure.identity import DefaultAzureCredential
+from typing import List, Dict, Optional, Tuple
+import orjson
+from azure.cosmos.aio import CosmosClient
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from azure.identity.aio import DefaultAzureCredential
 import logging
 from pathlib import Path
 
@@ -26,49 +31,72 @@ class CosmosDBService:
         
         # Load analyses data from JSON file
         self.analyses_data = self._load_analyses_data()
+        self._analyses_by_id = self._index_analyses(self.analyses_data.get("analyses", []))
+        # Same order as the Cosmos DB listing (newest first), so fallback listings need no re-sort
+        self.analyses_data.get("analyses", []).sort(key=self._page_key, reverse=True)
+        
+        # Database and container configuration
+        self.database_name = os.getenv('COSMOS_DATABASE_NAME', 'investmentresearch_d')
+        self.container_name = os.getenv('COSMOS_CONTAINER_NAME', 'investmentresearch_c')
+        
+        # The async client binds to the running event loop, so it is created on first use
+        # (see _get_container) rather than here, at import time
+        self.client = None
+        self.database = None
+        self.container = None
+        self._credential = None
         
         # Option 1: Use Managed Identity (production)
         if os.getenv('AZURE_COSMOS_ENDPOINT'):
-            endpoint = os.getenv('AZURE_COSMOS_ENDPOINT')
-            credential = DefaultAzureCredential()
-            self.client = CosmosClient(endpoint, credential=credential)
-            logger.info("✅ Cosmos DB connected using Managed Identity")
+            self._auth = "managed_identity"
+            logger.info("✅ Cosmos DB configured using Managed Identity")
         
         # Option 2: Use connection string (fallback)
         elif os.getenv('COSMOS_CONNECTION_STRING'):
-            connection_string = os.getenv('COSMOS_CONNECTION_STRING')
-            self.client = CosmosClient.from_connection_string(connection_string)
-            logger.info("✅ Cosmos DB connected using connection string")
+            self._auth = "connection_string"
+            logger.info("✅ Cosmos DB configured using connection string")
         
         else:
             logger.warning("⚠️ No Cosmos DB credentials found in environment")
-            self.client = None
-            self.database = None
-            self.container = None
-            return
-        
-        # Database and container configuration
-        self.database_name = os.getenv('COSMOS_DATABASE_NAME', 'investmentresearch_d')
-        self.container_name = os.getenv('COSMOS_CONTAINER_NAME', 'investmentresearch_c')
+            self._auth = None
         
-        try:
+        # The aio clients need the aiohttp transport. Without it every call would fail and be
+        # caught below, silently serving local data, so refuse to start instead
+        if self._auth is not None and importlib.util.find_spec("aiohttp") is None:
+            raise RuntimeError("Cosmos DB is configured but aiohttp is not installed (pip install aiohttp)")
+    
+    async def _get_container(self):
+        """Return the container client, connecting on first call"""
+        if self.container is None:
+            if self._auth == "managed_identity":
+                self._credential = DefaultAzureCredential()
+                self.client = CosmosClient(os.getenv('AZURE_COSMOS_ENDPOINT'), credential=self._credential)
+            else:
+                self.client = CosmosClient.from_connection_string(os.getenv('COSMOS_CONNECTION_STRING'))
             self.database = self.client.get_database_client(self.database_name)
             self.container = self.database.get_container_client(self.container_name)
             logger.info(f"✅ Cosmos DB service ready: {self.database_name}/{self.container_name}")
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Cosmos DB: {e}")
-            self.database = None
-            self.container = None
+        return self.container
+    
+    async def close(self):
+        """Close the Cosmos DB client and its credential"""
+        if self.client is not None:
+            await self.client.close()
+        if self._credential is not None:
+            await self._credential.close()
+        self.client = None
+        self.database = None
+        self.container = None
+        self._credential = None
     
     def _load_agents_responses(self) -> Dict:
         """Load agent responses from JSON file"""
         try:
             json_path = Path(__file__).parent / "agents_responses.json"
             if json_path.exists():
-                with open(json_path, 'r') as f:
-                    data = json.load(f)
-                    logger.info(f"📄 Loaded agents data with {data.get('responseCount', 0)} responses")
-                    return data
+                data = orjson.loads(json_path.read_bytes())
+                logger.info(f"📄 Loaded agents data with {data.get('responseCount', 0)} responses")
+                return data
             else:
                 logger.warning("⚠️ agents_responses.json not found")
                 return {"agents": {}, "messageCount": 0, "responseCount": 0}
@@ -81,10 +109,9 @@ class CosmosDBService:
         try:
             json_path = Path(__file__).parent / "analyses_data.json"
             if json_path.exists():
-                with open(json_path, 'r') as f:
-                    data = json.load(f)
-                    logger.info(f"📄 Loaded analyses data with {len(data.get('analyses', []))} analyses")
-                    return data
+                data = orjson.loads(json_path.read_bytes())
+                logger.info(f"📄 Loaded analyses data with {len(data.get('analyses', []))} analyses")
+                return data
             else:
                 logger.warning("⚠️ analyses_data.json not found")
                 return {"analyses": []}
@@ -92,19 +119,27 @@ class CosmosDBService:
             logger.error(f"❌ Failed to load analyses data: {e}")
             return {"analyses": []}
     
+    @staticmethod
+    def _index_analyses(analyses: List[Dict]) -> Dict[str, Dict]:
+        """Map each analysis' id and analysisId to it; the first analysis wins on clashes"""
+        index = {}
+        for analysis in analyses:
+            for key in ("id", "analysisId"):
+                if analysis.get(key):
+                    index.setdefault(analysis[key], analysis)
+        return index
+    
     def is_enabled(self) -> bool:
-        """Check if Cosmos DB is enabled and connected"""
-        return self.container is not None
+        """Check if Cosmos DB credentials are configured"""
+        return self._auth is not None
     
     def generate_analysis_id(self) -> str:
-        """Generate unique analysis ID"""
-        import random
-        import string
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
-        random_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-        return f"analysis-{timestamp}-{random_suffix}"
+        """Generate unique analysis ID: nanosecond timestamp plus 80 random bits, sortable by creation time"""
+        # base32hex keeps byte order when compared as text, unlike standard base32
+        raw = time.time_ns().to_bytes(8, "big") + os.urandom(10)
+        return "analysis-" + base64.b32hexencode(raw).decode("ascii").rstrip("=").lower()
     
-    def create_analysis(self, company_name: str, analyst_name: str = None, ticker: str = None, additional_data: Dict = None) -> Dict:
+    async def create_analysis(self, company_name: str, analyst_name: str = None, ticker: str = None, additional_data: Dict = None) -> Dict:
         """
         Create new analysis workflow with predefined agent responses
         
@@ -144,7 +179,8 @@ class CosmosDBService:
                 logger.info(f"   Company: {company_name}")
                 logger.info(f"   Partition Key: workflowid={analysis_id}")
                 
-                created_doc = self.container.create_item(
+                container = await self._get_container()
+                created_doc = await container.create_item(
                     body=analysis_doc,
                     enable_automatic_id_generation=False
                 )
@@ -156,7 +192,6 @@ class CosmosDBService:
                 return created_doc
             except Exception as e:
                 logger.error(f"❌ Failed to create analysis in Cosmos DB: {e}")
-                import traceback
                 logger.error(traceback.format_exc())
                 # Return local document with agents data if Cosmos DB fails
                 analysis_doc.update(self.agents_data)
@@ -165,7 +200,7 @@ class CosmosDBService:
             logger.info(f"📋 Cosmos DB not enabled, returning local analysis: {analysis_id}")
             return analysis_doc
     
-    def get_analysis(self, analysis_id: str) -> Optional[Dict]:
+    async def get_analysis(self, analysis_id: str) -> Optional[Dict]:
         """
         Get analysis by ID
         
@@ -177,16 +212,14 @@ class CosmosDBService:
         """
         if not self.is_enabled():
             # Return from loaded data if Cosmos DB not available
-            for analysis in self.analyses_data.get("analyses", []):
-                if analysis.get("id") == analysis_id or analysis.get("analysisId") == analysis_id:
-                    return analysis
-            return None
+            return self._analyses_by_id.get(analysis_id)
         
         try:
             logger.info(f"🔍 Fetching analysis: {analysis_id}")
             logger.info(f"   Partition Key: workflowid={analysis_id}")
             
-            item = self.container.read_item(
+            container = await self._get_container()
+            item = await container.read_item(
                 item=analysis_id,
                 partition_key=analysis_id
             )
@@ -198,70 +231,137 @@ class CosmosDBService:
             return item
         except Exception as e:
             logger.error(f"❌ Failed to get analysis: {e}")
-            import traceback
             logger.error(traceback.format_exc())
             # Try to return from loaded data
-            for analysis in self.analyses_data.get("analyses", []):
-                if analysis.get("id") == analysis_id or analysis.get("analysisId") == analysis_id:
-                    return analysis
+            return self._analyses_by_id.get(analysis_id)
+    
+    # Fields the analysis listing needs; agents are merged in from agents_data
+    LIST_FIELDS = (
+        "id", "workflowid", "workflowId", "companyName", "ticker", "analystName",
+        "status", "createdAt", "updatedAt", "completedAt"
+    )
+    
+    @staticmethod
+    def _page_key(analysis: Dict) -> Tuple[str, str]:
+        """Sort key for listings: newest createdAt first, ties broken by id"""
+        return analysis.get("createdAt") or "", analysis.get("id") or ""
+    
+    @classmethod
+    def _next_cursor(cls, source: str, items: List[Dict], limit: int) -> Optional[str]:
+        """Cursor after the last item when the page is full, else None (last page)
+        
+        The cursor names its data source ("cosmos" or "local") so later pages
+        keep reading from the source that served the first one.
+        """
+        if not items or len(items) < limit:
             return None
+        payload = orjson.dumps([source, *cls._page_key(items[-1])])
+        return base64.urlsafe_b64encode(payload).decode("ascii")
     
-    def list_analyses(self) -> List[Dict]:
+    @staticmethod
+    def _parse_cursor(continuation: str) -> Tuple[str, str, str]:
+        """Decode a cursor into (source, createdAt, id); raises ValueError if malformed"""
+        try:
+            source, created_at, analysis_id = orjson.loads(base64.urlsafe_b64decode(continuation.encode("ascii")))
+        except Exception:
+            raise ValueError(f"Invalid continuation token: {continuation!r}") from None
+        return source, created_at, analysis_id
+    
+    def _list_local_analyses(self, limit: int, after: Optional[Tuple[str, str]] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Page the loaded analyses (already sorted by _page_key, newest first)"""
+        analyses = self.analyses_data.get("analyses", [])
+        if after is not None:
+            analyses = [a for a in analyses if self._page_key(a) < after]
+        page = analyses[:limit]
+        return page, self._next_cursor("local", page, limit)
+    
+    async def list_analyses(self, limit: int = 100, continuation: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
         """
-        List all analyses
+        List analyses, newest first, one page at a time
         
+        Pages are keyed by (createdAt, id): the SDK returns no continuation token
+        for cross-partition ORDER BY queries, so each page asks for the analyses
+        that sort after the last one already returned. The Cosmos DB container
+        needs a composite index on (createdAt DESC, id DESC) for this query.
+        When the first page falls back to the loaded data, so do the pages after it.
+        
+        Args:
+            limit: Maximum number of analyses to return
+            continuation: Cursor from the previous page, or None for the first page
+            
         Returns:
-            List of analysis documents
+            (analysis documents, cursor for the next page or None)
+        
+        Raises:
+            ValueError: If ``continuation`` is not a cursor returned by this method
         """
-        if not self.is_enabled():
-            logger.info("📋 Cosmos DB not enabled, returning loaded analyses")
-            return self.analyses_data.get("analyses", [])
+        source, after = None, None
+        if continuation is not None:
+            source, created_at, analysis_id = self._parse_cursor(continuation)
+            after = (created_at, analysis_id)
+        
+        if not self.is_enabled() or source == "local":
+            logger.info("📋 Returning loaded analyses")
+            return self._list_local_analyses(limit, after)
         
         try:
-            logger.info(f"📊 Listing all analyses from {self.container_name}")
+            logger.info(f"📊 Listing analyses from {self.container_name} (page size {limit})")
             
-            query = "SELECT * FROM c ORDER BY c.createdAt DESC"
-            items = list(self.container.query_items(
-                query=query,
-                enable_cross_partition_query=True
-            ))
+            # Project only the listed fields and fetch a single page instead of the whole container
+            fields = ', '.join('c.' + field for field in self.LIST_FIELDS)
+            where = (
+                "WHERE (c.createdAt < @createdAt OR (c.createdAt = @createdAt AND c.id < @id)) "
+                if after is not None else ""
+            )
+            query = f"SELECT TOP @limit {fields} FROM c {where}ORDER BY c.createdAt DESC, c.id DESC"
+            parameters = [{"name": "@limit", "value": limit}]
+            if after is not None:
+                parameters.append({"name": "@createdAt", "value": after[0]})
+                parameters.append({"name": "@id", "value": after[1]})
+            
+            container = await self._get_container()
+            items = [item async for item in container.query_items(query=query, parameters=parameters)]
             
             logger.info(f"✅ Retrieved {len(items)} analyses")
             
             # If no items in Cosmos DB, return loaded data
-            if not items:
+            if not items and after is None:
                 logger.info("📋 No analyses in Cosmos DB, returning loaded data")
-                return self.analyses_data.get("analyses", [])
+                return self._list_local_analyses(limit)
             
             # Merge agents data into each analysis
             for analysis in items:
                 analysis.update(self.agents_data)
             
-            return items
+            return items, self._next_cursor("cosmos", items, limit)
         except Exception as e:
             logger.error(f"❌ Failed to list analyses: {e}")
-            import traceback
             logger.error(traceback.format_exc())
-            return self.analyses_data.get("analyses", [])
+            # Only a first page may fall back; a later page must not mix in another data source
+            if after is not None:
+                raise
+            return self._list_local_analyses(limit)
     
-    def update_analysis_status(self, analysis_id: str, status: str) -> Optional[Dict]:
+    async def update_analysis_status(self, analysis_id: str, status: str) -> Optional[Dict]:
         """Update analysis status"""
         if not self.is_enabled():
             return None
         
         try:
-            analysis = self.get_analysis(analysis_id)
-            if not analysis:
-                return None
-            
-            analysis["status"] = status
-            analysis["updatedAt"] = datetime.utcnow().isoformat() + 'Z'
+            timestamp = datetime.utcnow().isoformat() + 'Z'
+            operations = [
+                {"op": "set", "path": "/status", "value": status},
+                {"op": "set", "path": "/updatedAt", "value": timestamp}
+            ]
             if status == "completed":
-                analysis["completedAt"] = analysis["updatedAt"]
+                operations.append({"op": "set", "path": "/completedAt", "value": timestamp})
             
-            updated = self.container.replace_item(
+            # Patch only the changed fields instead of reading and replacing the whole document
+            container = await self._get_container()
+            updated = await container.patch_item(
                 item=analysis_id,
-                body=analysis
+                partition_key=analysis_id,
+                patch_operations=operations
             )
             
             logger.info(f"✅ Updated analysis status: {analysis_id} -> {status}")
@@ -270,38 +370,82 @@ class CosmosDBService:
             logger.error(f"❌ Failed to update analysis status: {e}")
             return None
     
-    def update_agent_status(self, analysis_id: str, agent_key: str, status: str, output: str = None) -> Optional[Dict]:
+    async def update_agent_status(self, analysis_id: str, agent_key: str, status: str, output: str = None) -> Optional[Dict]:
         """Update agent status and output"""
         if not self.is_enabled():
             return None
         
         try:
-            analysis = self.get_analysis(analysis_id)
-            if not analysis:
-                return None
-            
-            if agent_key not in analysis.get("agents", {}):
-                logger.warning(f"⚠️ Agent {agent_key} not found in analysis {analysis_id}")
-                return None
-            
             timestamp = datetime.utcnow().isoformat() + 'Z'
-            analysis["agents"][agent_key]["status"] = status
-            analysis["updatedAt"] = timestamp
-            
-            if status == "running" and not analysis["agents"][agent_key].get("startedAt"):
-                analysis["agents"][agent_key]["startedAt"] = timestamp
-            elif status == "completed":
-                analysis["agents"][agent_key]["completedAt"] = timestamp
+            changes = {"status": status}
+            if status == "completed":
+                changes["completedAt"] = timestamp
                 if output:
-                    analysis["agents"][agent_key]["output"] = output
+                    changes["output"] = output
             
-            updated = self.container.replace_item(
-                item=analysis_id,
-                body=analysis
-            )
+            container = await self._get_container()
+            try:
+                updated = await container.patch_item(
+                    item=analysis_id,
+                    partition_key=analysis_id,
+                    patch_operations=[
+                        *({"op": "set", "path": f"/agents/{agent_key}/{field}", "value": value} for field, value in changes.items()),
+                        {"op": "set", "path": "/updatedAt", "value": timestamp}
+                    ]
+                )
+            except CosmosHttpResponseError as e:
+                # 400 means the stored document has no agents.{agent_key} yet: agents are merged in
+                # from agents_data on read and only written back by the first full replace
+                if e.status_code != 400:
+                    raise
+                if status == "running":
+                    changes["startedAt"] = timestamp
+                updated = await self._replace_agent_status(analysis_id, agent_key, changes, timestamp)
+                if updated is None:
+                    return None
+            else:
+                if status == "running":
+                    updated = await self._patch_started_at(container, analysis_id, agent_key, timestamp) or updated
             
             logger.info(f"✅ Updated agent {agent_key} status: {status}")
             return updated
         except Exception as e:
             logger.error(f"❌ Failed to update agent status: {e}")
             return None
+    
+    async def _patch_started_at(self, container, analysis_id: str, agent_key: str, timestamp: str) -> Optional[Dict]:
+        """Set the agent's startedAt unless it is already set; returns None if it was"""
+        try:
+            return await container.patch_item(
+                item=analysis_id,
+                partition_key=analysis_id,
+                patch_operations=[{"op": "set", "path": f"/agents/{agent_key}/startedAt", "value": timestamp}],
+                filter_predicate=f'FROM c WHERE NOT IS_DEFINED(c.agents["{agent_key}"].startedAt)'
+            )
+        except CosmosHttpResponseError as e:
+            # 412: the filter did not match, so the first start time is kept
+            if e.status_code != 412:
+                raise
+            return None
+    
+    async def _replace_agent_status(self, analysis_id: str, agent_key: str, changes: Dict, timestamp: str) -> Optional[Dict]:
+        """Write agent changes by replacing the whole document, merged with agents_data"""
+        analysis = await self.get_analysis(analysis_id)
+        if not analysis:
+            return None
+        
+        if agent_key not in analysis.get("agents", {}):
+            logger.warning(f"⚠️ Agent {agent_key} not found in analysis {analysis_id}")
+            return None
+        
+        agent = analysis["agents"][agent_key]
+        if agent.get("startedAt"):
+            changes.pop("startedAt", None)
+        agent.update(changes)
+        analysis["updatedAt"] = timestamp
+        
+        container = await self._get_container()
+        return await container.replace_item(
+            item=analysis_id,
+            body=analysis
+        )
@@ -3,13 +3,14 @@ FastAPI Backend for GMR Investment Analysis.
 Provides REST API + SSE streaming for multi-agent orchestration with Azure AD authentication.
 """
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
 from azure.identity import DefaultAzureCredential
 from datetime import datetime
 from typing import Optional
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from pathlib import Path
 import asyncio
 import json
@@ -32,8 +33,25 @@ from cosmos_service import CosmosDBService
 # Get root_path from environment variable, default to "" for local development
 root_path = os.getenv("ROOT_PATH", "")
 
+# Initialize Cosmos DB Service
+logger.info("🔧 Initializing Cosmos DB Service...")
+cosmos_db = CosmosDBService()
+if cosmos_db.is_enabled():
+    logger.info("✅ Cosmos DB service initialized successfully")
+else:
+    logger.warning("⚠️ Cosmos DB not enabled - using local data fallback")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the Cosmos DB client's connection pool on shutdown"""
+    yield
+    await cosmos_db.close()
+
+
 # --- FastAPI Application ---
 app = FastAPI(
+    lifespan=lifespan,
     title="GMR Investment Analysis API",
     description="REST API for GMR Investment Analysis with multi-agent orchestration. Provides SSE streaming for real-time progress updates.",
     version="1.0.0",
@@ -75,14 +93,6 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-# Initialize Cosmos DB Service
-logger.info("🔧 Initializing Cosmos DB Service...")
-cosmos_db = CosmosDBService()
-if cosmos_db.is_enabled():
-    logger.info("✅ Cosmos DB service initialized successfully")
-else:
-    logger.warning("⚠️ Cosmos DB not enabled - using local data fallback")
-
 # Global state
 analysis_sessions = {}
 event_queues = defaultdict(asyncio.Queue)
@@ -152,7 +162,7 @@ async def run_analysis_with_progress(analysis_id: str, use_cached_data: bool = T
             # Update Cosmos DB with stock analyst output
             if cosmos_db.is_enabled() and analysis_sessions[analysis_id].get("cosmos_id"):
                 try:
-                    cosmos_db.update_agent_status(
+                    await cosmos_db.update_agent_status(
                         analysis_sessions[analysis_id]["cosmos_id"],
                         "stock_analyst",
                         "completed",
@@ -189,7 +199,7 @@ async def run_analysis_with_progress(analysis_id: str, use_cached_data: bool = T
             # Update Cosmos DB with company analyst output
             if cosmos_db.is_enabled() and analysis_sessions[analysis_id].get("cosmos_id"):
                 try:
-                    cosmos_db.update_agent_status(
+                    await cosmos_db.update_agent_status(
                         analysis_sessions[analysis_id]["cosmos_id"],
                         "company_analyst",
                         "completed",
@@ -230,7 +240,7 @@ async def run_analysis_with_progress(analysis_id: str, use_cached_data: bool = T
             # Update Cosmos DB with compliance evaluator output
             if cosmos_db.is_enabled() and analysis_sessions[analysis_id].get("cosmos_id"):
                 try:
-                    cosmos_db.update_agent_status(
+                    await cosmos_db.update_agent_status(
                         analysis_sessions[analysis_id]["cosmos_id"],
                         "compliance_evaluator",
                         "completed",
@@ -322,7 +332,7 @@ async def run_analysis_with_progress(analysis_id: str, use_cached_data: bool = T
         # Update Cosmos DB analysis status to completed
         if cosmos_db.is_enabled() and analysis_sessions[analysis_id].get("cosmos_id"):
             try:
-                cosmos_db.update_analysis_status(
+                await cosmos_db.update_analysis_status(
                     analysis_sessions[analysis_id]["cosmos_id"],
                     "completed"
                 )
@@ -339,7 +349,7 @@ async def run_analysis_with_progress(analysis_id: str, use_cached_data: bool = T
         # Update Cosmos DB analysis status to failed
         if cosmos_db.is_enabled() and analysis_sessions[analysis_id].get("cosmos_id"):
             try:
-                cosmos_db.update_analysis_status(
+                await cosmos_db.update_analysis_status(
                     analysis_sessions[analysis_id]["cosmos_id"],
                     "failed"
                 )
@@ -432,7 +442,7 @@ async def trigger_analysis(background_tasks: BackgroundTasks, use_cached: bool =
     # Create analysis record in Cosmos DB
     if cosmos_db.is_enabled():
         try:
-            cosmos_analysis = cosmos_db.create_analysis(
+            cosmos_analysis = await cosmos_db.create_analysis(
                 company_name="GMR Airports Ltd",
                 ticker="GMRAIRPORT.NS",
                 analyst_name="System"
@@ -564,23 +574,31 @@ async def delete_session(analysis_id: str):
 
 @app.get("/api/analyses",
          tags=["Analysis"])
-async def list_analyses():
+async def list_analyses(limit: int = Query(100, ge=1, le=1000), continuation: Optional[str] = None):
     """
-    List all investment analyses from Cosmos DB.
+    List investment analyses from Cosmos DB, newest first.
+    
+    Parameters:
+    - limit: Maximum number of analyses per page (1-1000)
+    - continuation: Cursor from a previous response to fetch the next page
     
     Returns:
-    - List of analysis documents with agent outputs
+    - List of analysis documents with agent outputs, and the cursor for the next page (null on the last page)
     """
     try:
-        logger.info("📋 Fetching all analyses from Cosmos DB")
-        analyses = cosmos_db.list_analyses()
+        logger.info("📋 Fetching analyses from Cosmos DB")
+        analyses, next_token = await cosmos_db.list_analyses(limit=limit, continuation=continuation)
         logger.info(f"✅ Retrieved {len(analyses)} analyses")
         
         return {
             "analyses": analyses,
             "total": len(analyses),
+            "continuation": next_token,
             "timestamp": datetime.now().isoformat()
         }
+    except ValueError as e:
+        # Malformed continuation cursor
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Failed to list analyses: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -600,7 +618,7 @@ async def get_analysis(analysis_id: str):
     """
     try:
         logger.info(f"🔍 Fetching analysis: {analysis_id}")
-        analysis = cosmos_db.get_analysis(analysis_id)
+        analysis = await cosmos_db.get_analysis(analysis_id)
         
         if not analysis:
             raise HTTPException(status_code=404, detail=f"Analysis not found: {analysis_id}")
@@ -635,7 +653,7 @@ async def create_analysis(
     try:
         logger.info(f"📝 Creating new analysis for {company_name}")
         
-        analysis = cosmos_db.create_analysis(
+        analysis = await cosmos_db.create_analysis(
             company_name=company_name,
             ticker=ticker,
             analyst_name=analyst_name
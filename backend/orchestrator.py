@@ -7,23 +7,32 @@ Coordinates three specialized agents using AutoGen framework:
 3. Compliance Agent - Evaluates PMS fair-valuation compliance
 
 Uses AutoGen GroupChat for multi-agent orchestration.
+
+Live agent output and the GroupChat summary go through the module logger at
+INFO level; configure logging (e.g. logging.basicConfig(level=logging.INFO))
+to see them. Running this file directly does so.
 """
 
 import asyncio
-import json
+import collections
+import functools
+import logging
 import os
-import subprocess
+import re
 import sys
 import traceback
 import warnings
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, List
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Validate required environment variables
 REQUIRED_ENV_VARS = ["AZURE_OPENAI_ENDPOINT", "AZURE_MODEL_DEPLOYMENT"]
 missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
@@ -52,15 +61,294 @@ except ImportError as e:
         "pip install azure-identity autogen-ext[azure]"
     ) from e
 
-# AutoGen imports
-try:
-    import autogen
-    from autogen import AssistantAgent, UserProxyAgent, GroupChat, GroupChatManager
+# AutoGen is imported on first use, so callers that only load cached data skip its import cost.
+# None until the first import attempt.
+AUTOGEN_AVAILABLE: Optional[bool] = None
+
+
+@functools.lru_cache(maxsize=1)
+def _import_autogen():
+    """Import AutoGen once; return (AssistantAgent, UserProxyAgent, GroupChat, GroupChatManager) or None"""
+    global AUTOGEN_AVAILABLE
+    try:
+        from autogen import AssistantAgent, UserProxyAgent, GroupChat, GroupChatManager
+    except ImportError:
+        AUTOGEN_AVAILABLE = False
+        print("❌ AutoGen framework not available - falling back to subprocess mode")
+        return None
     AUTOGEN_AVAILABLE = True
     print("✅ AutoGen framework loaded successfully")
-except ImportError:
-    AUTOGEN_AVAILABLE = False
-    print("❌ AutoGen framework not available - falling back to subprocess mode")
+    return AssistantAgent, UserProxyAgent, GroupChat, GroupChatManager
+
+
+@functools.lru_cache(maxsize=1)
+def _build_azure_auth():
+    """Create the Entra ID token provider and Azure OpenAI chat client once per process
+    
+    Sharing them across orchestrator instances also shares the credential's token cache.
+    """
+    # Create DefaultAzureCredential (tries multiple auth methods in order)
+    # Order: Environment → Managed Identity → Azure CLI → Azure PowerShell → VS Code
+    credential = DefaultAzureCredential(
+        exclude_shared_token_cache_credential=True,  # Skip cached tokens
+        exclude_visual_studio_code_credential=False  # Allow VS Code auth
+    )
+    print("   ✅ DefaultAzureCredential created")
+    
+    # Create token provider for Cognitive Services scope
+    try:
+        token_provider = AzureTokenProvider(
+            credential=credential,
+            scopes=["https://cognitiveservices.azure.com/.default"]
+        )
+    except TypeError:
+        # Fallback for older autogen-ext versions
+        token_provider = AzureTokenProvider(
+            credential,
+            "https://cognitiveservices.azure.com/.default"
+        )
+    print("   ✅ Azure token provider configured")
+    
+    # Get Azure OpenAI configuration from environment
+    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+    azure_deployment = os.getenv("AZURE_MODEL_DEPLOYMENT")
+    
+    if not azure_endpoint or not azure_deployment:
+        raise ValueError("AZURE_OPENAI_ENDPOINT and AZURE_MODEL_DEPLOYMENT must be set")
+    
+    # Create Azure OpenAI chat client with token authentication
+    azure_chat_client = AzureOpenAIChatCompletionClient(
+        azure_endpoint=azure_endpoint,
+        model=azure_deployment,
+        azure_deployment=azure_deployment,
+        azure_ad_token_provider=token_provider,
+        api_version="2024-10-01-preview"
+    )
+    print(f"   ✅ Azure OpenAI client configured")
+    print(f"      Endpoint: {azure_endpoint}")
+    print(f"      Deployment: {azure_deployment}")
+    print(f"      Auth: Entra ID (DefaultAzureCredential)")
+    
+    return token_provider, azure_chat_client
+
+
+@functools.lru_cache(maxsize=1)
+def _build_llm_config() -> Dict[str, Any]:
+    """AutoGen llm_config, built once per process from the environment"""
+    azure_deployment = os.getenv("AZURE_MODEL_DEPLOYMENT", "gpt-4o-mini")
+    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+    token_provider, _ = _build_azure_auth()
+    
+    # Configure for autogen with token provider (no model_client - not supported in old autogen)
+    return {
+        "config_list": [{
+            "model": azure_deployment,
+            "api_type": "azure",
+            "api_version": "2024-10-01-preview",
+            "azure_endpoint": azure_endpoint,
+            "azure_deployment": azure_deployment,
+            "azure_ad_token_provider": token_provider
+        }],
+        "temperature": 0.3,
+        "timeout": 300
+    }
+
+
+# Compliance status and risk profile markers in AutoGen messages (matched on upper-cased text).
+# One alternation with a named group per category finds both kinds in a single pass.
+_DECISION_RE = re.compile(
+    r'(?P<compliance>APPROVED|COMPLIANT|CONDITIONAL|REVIEW REQUIRED|REJECTED|NON-COMPLIANT)'
+    r'|(?P<risk>HIGH RISK|MODERATE RISK|LOW RISK)'
+)
+
+# AutoGen assistant roles as (key in the agents dict, agent name)
+_AGENT_ROLES = (
+    ("stock", "Stock_Analyst"),
+    ("investment", "Investment_Analyst"),
+    ("compliance", "Compliance_Evaluator")
+)
+
+# Idle AutoGen agent sets reused across runs and orchestrator instances. A run checks
+# one out and returns it when done, so concurrent runs never share an agent.
+_IDLE_AGENT_SETS: List[Dict[str, Any]] = []
+
+# Section separators used in console output
+BANNER = "=" * 80
+RULE = "-" * 80
+
+# Lines of agent stdout/stderr kept for status reports
+SUBPROCESS_TAIL_LINES = 40
+
+# Agent log lines buffered for a progress callback before new lines are dropped
+PROGRESS_QUEUE_SIZE = 1000
+
+# Line a persistent agent worker prints after each run (see agents/_worker.py)
+WORKER_DONE_MARKER = b"__AGENT_DONE__"
+
+# Echo agent output to the console in full only when ORCH_VERBOSE=1; otherwise long
+# lines are cut to their head and tail
+VERBOSE = os.getenv("ORCH_VERBOSE") == "1"
+ECHO_EDGE_CHARS = 512
+
+
+def _elide(text: str) -> str:
+    """Shorten long console text to its first and last ECHO_EDGE_CHARS characters"""
+    if VERBOSE or len(text) < 1200:
+        return text
+    return f"{text[:ECHO_EDGE_CHARS]}\n... [{len(text) - 2 * ECHO_EDGE_CHARS} chars elided] ...\n{text[-ECHO_EDGE_CHARS:]}"
+
+
+# Top-level keys of each agent artifact that the AutoGen prompts use. Everything else
+# (report metadata, raw LLM text) stays out of the prompts.
+_PROMPT_FIELDS = {
+    "stock_report.json": ("sections",),
+    "company_analysis_output.json": ("sections", "key_strengths", "key_challenges", "recommendation"),
+    "compliance_findings.json": (
+        "section_1_policy_rules", "section_2_trading_classification", "section_3_exceptional_events"
+    ),
+    "compliance_recommendation.json": ("section_4_final_recommendation",),
+}
+
+# Parsed JSON artifacts keyed by path, with the (mtime_ns, size) they were parsed at
+_JSON_CACHE: Dict[Path, Any] = {}
+
+
+def _read_json_file(path: Path) -> Optional[Dict[str, Any]]:
+    """Read a JSON file, returning None if it does not exist
+    
+    Unchanged files are served from _JSON_CACHE without re-parsing, so the
+    returned objects are shared between callers and must not be mutated.
+    """
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        _JSON_CACHE.pop(path, None)
+        return None
+    
+    key = (st.st_mtime_ns, st.st_size)
+    hit = _JSON_CACHE.get(path)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    
+    try:
+        data = orjson.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
+    _JSON_CACHE[path] = (key, data)
+    return data
+
+
+def _prompt_fields(file_name: str, data: Any) -> Any:
+    """Keep only the top-level keys of an agent artifact that the AutoGen prompts use"""
+    fields = _PROMPT_FIELDS.get(file_name)
+    if fields is None or not isinstance(data, dict):
+        return data
+    return {field: data[field] for field in fields if field in data}
+
+
+async def _read_json_files(paths: List[Path]) -> List[Optional[Dict[str, Any]]]:
+    """Read several JSON files concurrently off the event loop"""
+    return await asyncio.gather(*(asyncio.to_thread(_read_json_file, path) for path in paths))
+
+
+def _dump_sections(sections: Dict[str, Any]) -> Dict[str, str]:
+    """Serialize each value as indented JSON"""
+    return {key: orjson.dumps(value, option=orjson.OPT_INDENT_2).decode() for key, value in sections.items()}
+
+
+def _stat_or_none(path: Path) -> Optional[os.stat_result]:
+    """Stat a file, returning None if it does not exist"""
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+async def _snapshot_files(paths: List[Path]) -> Dict[Path, Optional[os.stat_result]]:
+    """Stat several files concurrently off the event loop, one syscall per file"""
+    stats = await asyncio.gather(*(asyncio.to_thread(_stat_or_none, path) for path in paths))
+    return dict(zip(paths, stats))
+
+
+class PersistentAgentPool:
+    """Long-lived agent worker processes, one per agent, reused across runs
+    
+    Each worker (agents/_worker.py) imports its agent once and runs it whenever
+    the agent name is written to its stdin, so repeated pipeline runs skip
+    interpreter start-up and SDK imports. Worker stdout and stderr are merged so
+    log lines and tracebacks arrive in order.
+    """
+    
+    def __init__(self, cwd: Path, env: Dict[str, str]):
+        self.cwd = cwd
+        self.env = env
+        self._workers = {}
+        # One lock per worker: a worker serves one request at a time, and the pool is
+        # shared by every orchestrator in the process
+        self._locks = collections.defaultdict(asyncio.Lock)
+        self._loop = None
+    
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Pipes belong to the loop that created them; workers of a closed loop see
+            # EOF on stdin and exit on their own
+            self._workers = {}
+            self._locks.clear()
+            self._loop = loop
+    
+    async def _get_worker(self, agent_name: str):
+        proc = self._workers.get(agent_name)
+        if proc is None or proc.returncode is not None:
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "agents._worker",
+                cwd=str(self.cwd),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                env=self.env,
+                limit=1024 * 1024  # Allow long single-line log records
+            )
+            self._workers[agent_name] = proc
+        return proc
+    
+    async def run(self, agent_name: str, on_line, timeout: float) -> str:
+        """Run an agent on its worker, passing each output line to ``on_line``
+        
+        Concurrent runs of the same agent wait for the worker in turn; ``timeout``
+        starts once the worker is free. If the run fails for any reason (including
+        timeout or cancellation) the worker is killed and the error is re-raised. Returns the worker's status ("success" or "error").
+        """
+        self._bind_loop()
+        async with self._locks[agent_name]:
+            try:
+                return await asyncio.wait_for(self._run_locked(agent_name, on_line), timeout=timeout)
+            except BaseException:
+                # Timeout, cancellation, an over-long line or an on_line error: the worker may be
+                # mid-run, so kill it before the next caller can read this run's output
+                await self.discard(agent_name)
+                raise
+    
+    async def _run_locked(self, agent_name: str, on_line) -> str:
+        proc = await self._get_worker(agent_name)
+        proc.stdin.write(f"{agent_name}\n".encode("utf-8"))
+        await proc.stdin.drain()
+        
+        async for line in proc.stdout:
+            if line.startswith(WORKER_DONE_MARKER):
+                return line[len(WORKER_DONE_MARKER):].strip().decode("utf-8")
+            on_line(line)
+        
+        # The worker exited mid-run; a fresh one is started next time
+        self._workers.pop(agent_name, None)
+        return "error"
+    
+    async def discard(self, agent_name: str):
+        """Kill an agent's worker, e.g. after a timeout"""
+        proc = self._workers.pop(agent_name, None)
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
 
 
 class GMRInvestmentOrchestrator:
@@ -69,9 +357,100 @@ class GMRInvestmentOrchestrator:
     Coordinates stock analysis, investment reporting, and compliance evaluation
     """
     
+    # Static parts of the AutoGen agent system messages; create_autogen_agents fills in
+    # {company}, {symbol} and the {metrics} block built from the agent outputs
+    _STOCK_SYSMSG_TEMPLATE = """You are a Senior Stock Analysis Specialist for {company} ({symbol}).
+
+YOUR ROLE: Provide technical analysis STATUS and key insights without generating files or images.
+
+Available data summary:
+{metrics}
+
+WHEN REQUESTED, PROVIDE ANALYSIS STATUS IN THIS FORMAT:
+
+🔍 STOCK ANALYSIS STATUS:
+• Data Source: Available/Cached stock report data
+• Analysis Type: Technical analysis with key metrics
+• Status: COMPLETED
+
+📊 KEY INSIGHTS:
+• 30-Day Return: [Extract from data if available]
+• Volatility: [Extract from data if available] 
+• Risk Level: [High/Moderate/Low based on volatility]
+• Trading Volume: [Extract from data if available]
+• Overall Verdict: [Strong/Moderate/Weak with brief reasoning]
+
+NOTE: Analysis is based on available cached data. No new files or charts generated.
+"""
+    
+    _INVESTMENT_SYSMSG_TEMPLATE = """You are a Senior Investment Analysis Specialist for {company} ({symbol}).
+
+YOUR ROLE: Provide investment analysis STATUS and key financial insights without generating files or images.
+
+Available data summary:
+{metrics}
+
+WHEN REQUESTED, PROVIDE ANALYSIS STATUS IN THIS FORMAT:
+
+🏦 INVESTMENT ANALYSIS STATUS:
+• Data Source: Available/Cached company analysis data
+• Analysis Type: Fundamental analysis with financial metrics
+• Status: COMPLETED
+
+💰 KEY FINANCIAL INSIGHTS:
+• Recommendation: [Extract from available data]
+• Revenue/EBITDA: [Key financial figures if available]
+• Debt Position: [Key debt metrics if available]
+• Operational Performance: [Key operational metrics if available]
+• Valuation: [Key valuation metrics if available]
+
+✅ KEY STRENGTHS:
+[List key strengths from available data]
+
+⚠️ KEY CHALLENGES:
+[List key challenges from available data]
+
+NOTE: Analysis is based on available cached data. No new files or reports generated.
+"""
+    
+    _COMPLIANCE_SYSMSG_TEMPLATE = """You are a Senior Compliance Officer for PMS (Portfolio Management Services) evaluation of {company} ({symbol}).
+
+YOUR ROLE: Provide compliance evaluation STATUS and key decisions without generating files or reports.
+
+Available data summary:
+{metrics}
+
+WHEN REQUESTED, PROVIDE COMPLIANCE STATUS IN THIS FORMAT:
+
+⚖️ COMPLIANCE EVALUATION STATUS:
+• Data Source: Available/Cached compliance findings and recommendations
+• Evaluation Type: PMS compliance assessment
+• Status: COMPLETED
+
+🔍 COMPLIANCE FINDINGS:
+• Overall Decision: [Extract final recommendation if available]
+• Risk Level: [Extract risk assessment if available]
+• Trading Status: [Extract trading approval status if available]
+• Key Concerns: [List main compliance issues if available]
+• Mitigation Required: [List required actions if available]
+
+✅ FINAL RECOMMENDATION:
+[Extract the final compliance decision and reasoning from available data]
+
+NOTE: Evaluation is based on available cached data. No new compliance reports generated.
+"""
+    
+    # AutoGen system messages built by create_autogen_agents, keyed by the (path, mtime, size)
+    # of the agent output files they were built from. Shared across instances because the API
+    # creates a new orchestrator per request.
+    _agents_cache: Optional[tuple] = None
+    
+    # Persistent agent workers, shared across instances for the same reason
+    _agent_pool: Optional[PersistentAgentPool] = None
+    
     def __init__(self):
         print("🚀 GMR INVESTMENT ANALYSIS ORCHESTRATOR - AUTOGEN FRAMEWORK")
-        print("="*80)
+        print(BANNER)
         
         self.base_dir = Path(__file__).parent
         self.data_dir = self.base_dir / "data"
@@ -88,6 +467,32 @@ class GMRInvestmentOrchestrator:
             "compliance": self.agents_dir / "compliance_agent.py"
         }
         
+        # Per-agent subprocess timeouts (seconds)
+        self.agent_timeouts = {
+            "stock_analyst": 600,
+            "investment_report": 900,
+            "compliance": 600
+        }
+        
+        # Cap on concurrent agent subprocesses; each one is a full interpreter with the Azure SDKs
+        self.max_parallel_agents = max(1, int(os.getenv("ORCH_MAX_PARALLEL_AGENTS", "3")))
+        self._agent_semaphore = None
+        
+        # Environment for agent subprocesses, built once. Agents print emoji, so force UTF-8
+        # to keep the child from failing on a narrow console encoding, and unbuffered output
+        # so log lines arrive as they are printed.
+        self._subprocess_env = {**os.environ, "PYTHONIOENCODING": "utf-8", "PYTHONUNBUFFERED": "1"}
+        
+        # JSON files written by each agent, keyed by where they go in agent_data
+        self.agent_outputs = {
+            "stock_analyst": {"stock_report_data": "stock_report.json"},
+            "investment_report": {"company_analysis_data": "company_analysis_output.json"},
+            "compliance": {
+                "compliance_recommendation": "compliance_recommendation.json",
+                "compliance_findings": "compliance_findings.json"
+            }
+        }
+        
         # Verify agent files exist
         self._verify_agent_files()
         
@@ -106,23 +511,7 @@ class GMRInvestmentOrchestrator:
         if not self.azure_chat_client:
             raise ValueError("Azure authentication failed - cannot proceed without valid credentials")
         
-        # Get deployment name for llm_config
-        azure_deployment = os.getenv("AZURE_MODEL_DEPLOYMENT", "gpt-4o-mini")
-        azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        
-        # Configure for autogen with token provider (no model_client - not supported in old autogen)
-        self.llm_config = {
-            "config_list": [{
-                "model": azure_deployment,
-                "api_type": "azure",
-                "api_version": "2024-10-01-preview",
-                "azure_endpoint": azure_endpoint,
-                "azure_deployment": azure_deployment,
-                "azure_ad_token_provider": self.token_provider
-            }],
-            "temperature": 0.3,
-            "timeout": 300
-        }
+        self.llm_config = _build_llm_config()
         self.agent_llm_kwargs = {"llm_config": self.llm_config}
         
         print(f"🏢 Company: {self.config['company_name']}")
@@ -130,55 +519,14 @@ class GMRInvestmentOrchestrator:
         print(f"📅 Analysis Date: {self.config['analysis_date']}")
         print(f"🤖 AutoGen: Available")
         print(f"🔐 Azure Auth: Entra ID (DefaultAzureCredential)")
-        print("="*80)
+        print(BANNER)
     
     def _setup_azure_auth(self):
         """Setup Azure DefaultAzureCredential authentication (Entra ID)"""
         print("\n🔐 Setting up Azure Entra ID authentication...")
         
         try:
-            # Create DefaultAzureCredential (tries multiple auth methods in order)
-            # Order: Environment → Managed Identity → Azure CLI → Azure PowerShell → VS Code
-            credential = DefaultAzureCredential(
-                exclude_shared_token_cache_credential=True,  # Skip cached tokens
-                exclude_visual_studio_code_credential=False  # Allow VS Code auth
-            )
-            print("   ✅ DefaultAzureCredential created")
-            
-            # Create token provider for Cognitive Services scope
-            try:
-                self.token_provider = AzureTokenProvider(
-                    credential=credential,
-                    scopes=["https://cognitiveservices.azure.com/.default"]
-                )
-            except TypeError:
-                # Fallback for older autogen-ext versions
-                self.token_provider = AzureTokenProvider(
-                    credential,
-                    "https://cognitiveservices.azure.com/.default"
-                )
-            print("   ✅ Azure token provider configured")
-            
-            # Get Azure OpenAI configuration from environment
-            azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-            azure_deployment = os.getenv("AZURE_MODEL_DEPLOYMENT")
-            
-            if not azure_endpoint or not azure_deployment:
-                raise ValueError("AZURE_OPENAI_ENDPOINT and AZURE_MODEL_DEPLOYMENT must be set")
-            
-            # Create Azure OpenAI chat client with token authentication
-            self.azure_chat_client = AzureOpenAIChatCompletionClient(
-                azure_endpoint=azure_endpoint,
-                model=azure_deployment,
-                azure_deployment=azure_deployment,
-                azure_ad_token_provider=self.token_provider,
-                api_version="2024-10-01-preview"
-            )
-            print(f"   ✅ Azure OpenAI client configured")
-            print(f"      Endpoint: {azure_endpoint}")
-            print(f"      Deployment: {azure_deployment}")
-            print(f"      Auth: Entra ID (DefaultAzureCredential)")
-            
+            self.token_provider, self.azure_chat_client = _build_azure_auth()
         except Exception as e:
             print(f"❌ Azure authentication failed: {e}")
             print("\n💡 TROUBLESHOOTING:")
@@ -190,10 +538,12 @@ class GMRInvestmentOrchestrator:
     
     def _verify_agent_files(self):
         """Verify all agent Python files exist"""
-        missing_files = []
-        for agent_name, agent_path in self.agent_scripts.items():
-            if not agent_path.exists():
-                missing_files.append(agent_name)
+        # One directory listing instead of a stat() per script
+        present = {p.name for p in self.agents_dir.iterdir()} if self.agents_dir.is_dir() else set()
+        missing_files = [
+            agent_name for agent_name, agent_path in self.agent_scripts.items()
+            if agent_path.name not in present
+        ]
         
         if missing_files:
             print(f"⚠️ Missing agent files: {', '.join(missing_files)} - will use cached data mode")
@@ -202,73 +552,242 @@ class GMRInvestmentOrchestrator:
         """Load existing JSON files without running agents"""
         agent_data = {}
         
+        stock_report, company_analysis, compliance_recommendation, compliance_findings = await _read_json_files([
+            self.data_dir / "stock_report.json",
+            self.data_dir / "company_analysis_output.json",
+            self.data_dir / "compliance_recommendation.json",
+            self.data_dir / "compliance_findings.json"
+        ])
+        
         # Load stock report
-        stock_report_file = self.data_dir / "stock_report.json"
-        if stock_report_file.exists():
-            with open(stock_report_file, 'r', encoding='utf-8') as f:
-                agent_data["stock_report_data"] = json.load(f)
+        if stock_report is not None:
+            agent_data["stock_report_data"] = stock_report
             agent_data["stock_analyst"] = {"status": "cached"}
         else:
             agent_data["stock_analyst"] = {"status": "missing"}
         
         # Load company analysis
-        company_analysis_file = self.data_dir / "company_analysis_output.json"
-        if company_analysis_file.exists():
-            with open(company_analysis_file, 'r', encoding='utf-8') as f:
-                agent_data["company_analysis_data"] = json.load(f)
+        if company_analysis is not None:
+            agent_data["company_analysis_data"] = company_analysis
             agent_data["investment_report"] = {"status": "cached"}
         else:
             agent_data["investment_report"] = {"status": "missing"}
         
         # Load compliance recommendation
-        compliance_findings_file = self.data_dir / "compliance_findings.json"
-        compliance_recommendation_file = self.data_dir / "compliance_recommendation.json"
-        
-        if compliance_recommendation_file.exists():
-            with open(compliance_recommendation_file, 'r', encoding='utf-8') as f:
-                agent_data["compliance_recommendation"] = json.load(f)
+        if compliance_recommendation is not None:
+            agent_data["compliance_recommendation"] = compliance_recommendation
             agent_data["compliance"] = {"status": "cached"}
         else:
             agent_data["compliance"] = {"status": "missing"}
         
-        if compliance_findings_file.exists():
-            with open(compliance_findings_file, 'r', encoding='utf-8') as f:
-                agent_data["compliance_findings"] = json.load(f)
+        if compliance_findings is not None:
+            agent_data["compliance_findings"] = compliance_findings
+        
+        return agent_data
+    
+    async def run_agent_subprocess(self, agent_name: str, timeout: int, progress_callback=None) -> Dict[str, Any]:
+        """Run one agent script in a child process without blocking the event loop
+        
+        At most ``max_parallel_agents`` agent processes run at once; the timeout
+        starts once a slot is free. When ``progress_callback`` is given, each
+        stdout line is forwarded as ``await progress_callback("agent_log", agent_name, line)``
+        while the agent runs.
+        """
+        # Created on first use so it binds to the running event loop
+        if self._agent_semaphore is None:
+            self._agent_semaphore = asyncio.Semaphore(self.max_parallel_agents)
+        
+        async with self._agent_semaphore:
+            return await self._run_agent_process(agent_name, timeout, progress_callback)
+    
+    async def _run_agent_process(self, agent_name: str, timeout: int, progress_callback=None) -> Dict[str, Any]:
+        agent_path = self.agent_scripts[agent_name]
+        print(f"▶️  Running {agent_name} ({agent_path.name})...")
+        
+        if GMRInvestmentOrchestrator._agent_pool is None:
+            GMRInvestmentOrchestrator._agent_pool = PersistentAgentPool(self.base_dir, self._subprocess_env)
+        pool = GMRInvestmentOrchestrator._agent_pool
+        
+        start_time = datetime.now()
+        
+        # Keep only the tail of the agent's output in memory
+        tail = collections.deque(maxlen=SUBPROCESS_TAIL_LINES)
+        
+        # Log lines go through a bounded queue so a slow callback never stalls the pipe;
+        # lines are dropped rather than buffered without limit when it falls behind
+        log_queue = asyncio.Queue(maxsize=PROGRESS_QUEUE_SIZE)
+        
+        def _on_line(line: bytes):
+            tail.append(line)
+            # Echo live; agents run side by side, so tag each line. Skip decoding when INFO is off
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("   [%s] %s", agent_name, _elide(line.decode("utf-8", errors="replace").rstrip()))
+            if progress_callback:
+                try:
+                    log_queue.put_nowait(line)
+                except asyncio.QueueFull:
+                    pass
+        
+        async def _forward_logs():
+            while (line := await log_queue.get()) is not None:
+                await progress_callback("agent_log", agent_name, line.decode("utf-8", errors="replace").rstrip())
+        
+        forwarder = asyncio.create_task(_forward_logs()) if progress_callback else None
+        try:
+            status = await pool.run(agent_name, _on_line, timeout)
+        except asyncio.TimeoutError:
+            print(f"⏱️  {agent_name} timed out after {timeout}s")
+            return {"status": "timeout", "error": f"Timed out after {timeout}s"}
+        finally:
+            if forwarder:
+                # Let queued lines go out, then stop the forwarder
+                await log_queue.put(None)
+                await forwarder
+        
+        execution_time = (datetime.now() - start_time).total_seconds()
+        output = b"".join(tail).decode("utf-8", errors="replace")[-2000:]
+        if status != "success":
+            print(f"❌ {agent_name} failed")
+            return {"status": "error", "error": output, "execution_time": execution_time}
+        
+        print(f"✅ {agent_name} completed in {execution_time:.1f}s")
+        return {
+            "status": "success",
+            "execution_time": execution_time,
+            "output": output
+        }
+    
+    async def _run_and_load(self, agent_name: str, progress_callback=None) -> Dict[str, Any]:
+        """Run one agent script and load the JSON files it produced"""
+        status = await self.run_agent_subprocess(
+            agent_name, timeout=self.agent_timeouts[agent_name], progress_callback=progress_callback
+        )
+        agent_data = {agent_name: status}
+        if status["status"] != "success":
+            return agent_data
+        
+        outputs = self.agent_outputs[agent_name]
+        contents = await _read_json_files([self.data_dir / file_name for file_name in outputs.values()])
+        for data_key, content in zip(outputs, contents):
+            if content is not None:
+                agent_data[data_key] = content
+        return agent_data
+    
+    async def collect_agent_data(self, progress_callback=None) -> Dict[str, Any]:
+        """Run the agent scripts to generate fresh data and load their outputs
+        
+        All three agents are gathered together and each loads its output as
+        soon as it finishes. The stock and investment reports are independent
+        and run side by side; compliance reads both of their outputs, so its
+        coroutine waits for them before starting its own subprocess.
+        """
+        print("\n🤖 STEP 1: Running Azure AI agents...")
+        print(BANNER)
+        
+        stock_task = asyncio.create_task(self._run_and_load("stock_analyst", progress_callback))
+        investment_task = asyncio.create_task(self._run_and_load("investment_report", progress_callback))
+        
+        async def _run_and_load_compliance():
+            upstream = await asyncio.gather(stock_task, investment_task, return_exceptions=True)
+            if any(isinstance(result, Exception) or result[name]["status"] != "success"
+                   for name, result in zip(("stock_analyst", "investment_report"), upstream)):
+                print("⚠️ Skipping compliance check - it needs both agent reports")
+                return {"compliance": {"status": "skipped"}}
+            return await self._run_and_load("compliance", progress_callback)
+        
+        results = await asyncio.gather(
+            stock_task, investment_task, _run_and_load_compliance(),
+            return_exceptions=True
+        )
         
+        agent_data = {}
+        for agent_name, result in zip(("stock_analyst", "investment_report", "compliance"), results):
+            if isinstance(result, Exception):
+                print(f"❌ {agent_name} failed: {result}")
+                agent_data[agent_name] = {"status": "error", "error": str(result)}
+            else:
+                agent_data.update(result)
         return agent_data
     
+    def _checkout_agents(self, AssistantAgent, UserProxyAgent, system_messages: Dict[str, str]) -> Dict[str, Any]:
+        """Take an idle AutoGen agent set, or build one, with ``system_messages``
+        
+        llm_config is fixed per process, so agents are constructed once and later
+        runs only swap in the system messages built from the new data. The set is
+        returned to the pool by run_autogen_orchestration.
+        """
+        if _IDLE_AGENT_SETS:
+            agents = _IDLE_AGENT_SETS.pop()
+            for key, _ in _AGENT_ROLES:
+                agents[key].update_system_message(system_messages[key])
+            return agents
+        
+        agents = {
+            key: AssistantAgent(name=name, system_message=system_messages[key], **self.agent_llm_kwargs)
+            for key, name in _AGENT_ROLES
+        }
+        # User Proxy for orchestration
+        agents["user_proxy"] = UserProxyAgent(
+            name="Analysis_Pipeline_Manager",
+            human_input_mode="NEVER",
+            max_consecutive_auto_reply=0,
+            code_execution_config=False
+        )
+        return agents
+    
     async def create_autogen_agents(self, agent_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create AutoGen agents with collected data"""
         
-        if not AUTOGEN_AVAILABLE:
+        autogen_classes = _import_autogen()
+        if autogen_classes is None:
             print("\n⚠️  AutoGen not available, skipping agent creation")
             return {}
+        AssistantAgent, UserProxyAgent, _, _ = autogen_classes
         
-        print("\n🤖 STEP 2: Creating AutoGen Agents...")
-        print("="*80)
+        output_files = {
+            data_key: self.data_dir / file_name
+            for outputs in self.agent_outputs.values()
+            for data_key, file_name in outputs.items()
+        }
         
-        # Load complete JSON files directly (fresh data from agents)
-        stock_report_file = self.data_dir / "stock_report.json"
-        company_analysis_file = self.data_dir / "company_analysis_output.json"
-        compliance_recommendation_file = self.data_dir / "compliance_recommendation.json"
+        # Unchanged output files produce identical agents; skip rebuilding the prompts and agents
+        snapshot = await _snapshot_files(list(output_files.values()))
+        cache_key = tuple(
+            (str(path), stat.st_mtime_ns, stat.st_size) if stat is not None else (str(path), None, None)
+            for path, stat in snapshot.items()
+        )
+        cached = GMRInvestmentOrchestrator._agents_cache
+        if cached and cached[0] == cache_key:
+            print("\n♻️ Reusing AutoGen agent prompts (agent outputs unchanged)")
+            return self._checkout_agents(AssistantAgent, UserProxyAgent, cached[1])
         
-        # Read stock report data
-        stock_data_raw = {}
-        if stock_report_file.exists():
-            with open(stock_report_file, 'r', encoding='utf-8') as f:
-                stock_data_raw = json.load(f)
+        print("\n🤖 STEP 2: Creating AutoGen Agents...")
+        print(BANNER)
+        
+        # Reuse the payloads already parsed into agent_data; read from disk only those it lacks
+        payloads = {key: agent_data[key] for key in output_files if key in agent_data}
+        missing_keys = [key for key in output_files if key not in payloads]
+        if missing_keys:
+            contents = await _read_json_files([output_files[key] for key in missing_keys])
+            payloads.update(zip(missing_keys, contents))
+        # Trim only the prompt inputs; agent_data keeps the full documents for callers
+        payloads = {key: _prompt_fields(output_files[key].name, data) for key, data in payloads.items()}
+        
+        stock_data_raw = payloads["stock_report_data"] or {}
+        company_data_raw = payloads["company_analysis_data"] or {}
+        compliance_findings_raw = payloads["compliance_findings"] or {}
+        compliance_recommendation_raw = payloads["compliance_recommendation"] or {}
         
         # Extract all stock sections with image paths
         sections = stock_data_raw.get('sections', [])
         
         # Build complete stock data with all sections including their image paths
-        stock_sections_text = ""
-        for section in sections:
-            section_id = section.get('id', '')
-            section_name = section.get('name', '')
-            section_summary = section.get('summary', '')
-            section_image = section.get('image_path', 'N/A')
-            stock_sections_text += f"\n### {section_name} (ID: {section_id})\nImage: {section_image}\n{section_summary}\n"
+        stock_sections_text = "".join(
+            f"\n### {section.get('name', '')} (ID: {section.get('id', '')})\n"
+            f"Image: {section.get('image_path', 'N/A')}\n"
+            f"{section.get('summary', '')}\n"
+            for section in sections
+        )
         
         stock_metrics = f"""
 COMPLETE STOCK REPORT SECTIONS:
@@ -279,53 +798,24 @@ The summary contains: 30-day return %, volatility %, avg daily volume, total tra
 Do NOT write "N/A" - extract the exact numbers mentioned in the text.
 """
         
-        stock_agent = AssistantAgent(
-            name="Stock_Analyst",
-            system_message=f"""You are a Senior Stock Analysis Specialist for {self.config['company_name']} (GMRAIRPORT.NS).
-
-YOUR ROLE: Provide technical analysis STATUS and key insights without generating files or images.
-
-Available data summary:
-{stock_metrics}
-
-WHEN REQUESTED, PROVIDE ANALYSIS STATUS IN THIS FORMAT:
-
-🔍 STOCK ANALYSIS STATUS:
-• Data Source: Available/Cached stock report data
-• Analysis Type: Technical analysis with key metrics
-• Status: COMPLETED
-
-📊 KEY INSIGHTS:
-• 30-Day Return: [Extract from data if available]
-• Volatility: [Extract from data if available] 
-• Risk Level: [High/Moderate/Low based on volatility]
-• Trading Volume: [Extract from data if available]
-• Overall Verdict: [Strong/Moderate/Weak with brief reasoning]
-
-NOTE: Analysis is based on available cached data. No new files or charts generated.
-""",
-        **self.agent_llm_kwargs,
-    )
-        
-        # Read company analysis data
-        company_data_raw = {}
-        if company_analysis_file.exists():
-            with open(company_analysis_file, 'r', encoding='utf-8') as f:
-                company_data_raw = json.load(f)
+        stock_sysmsg = self._STOCK_SYSMSG_TEMPLATE.format(
+            company=self.config['company_name'], symbol=self.config['stock_symbol'], metrics=stock_metrics
+        )
         
         # Extract ALL company financial data with complete sections and image paths
         sections_data = company_data_raw.get('sections', [])
         
         # Build company sections text with image paths
-        company_sections_text = ""
-        for section in sections_data:
-            section_id = section.get('id', '')
-            section_name = section.get('name', '')
-            section_analysis = section.get('analysis', '')
-            section_dashboard = section.get('dashboard', 'N/A')
-            section_images = section.get('images', [])
-            section_image = section_images[0] if section_images else 'N/A'
-            company_sections_text += f"\n### {section_name} (ID: {section_id})\nDashboard: {section_dashboard}\nImage: {section_image}\n{section_analysis}\n"
+        company_sections_text = "".join(
+            f"\n### {section.get('name', '')} (ID: {section.get('id', '')})\n"
+            f"Dashboard: {section.get('dashboard', 'N/A')}\n"
+            f"Image: {(section.get('images') or ['N/A'])[0]}\n"
+            f"{section.get('analysis', '')}\n"
+            for section in sections_data
+        )
+        
+        strengths_block = "\n".join(f"• {strength}" for strength in company_data_raw.get('key_strengths', []))
+        challenges_block = "\n".join(f"• {challenge}" for challenge in company_data_raw.get('key_challenges', []))
         
         company_metrics = f"""
 COMPLETE COMPANY FINANCIAL DATA:
@@ -333,136 +823,71 @@ COMPLETE COMPANY FINANCIAL DATA:
 RECOMMENDATION: {company_data_raw.get('recommendation', 'N/A')}
 
 KEY STRENGTHS:
-{chr(10).join('• ' + s for s in company_data_raw.get('key_strengths', []))}
+{strengths_block}
 
 KEY CHALLENGES:
-{chr(10).join('• ' + c for c in company_data_raw.get('key_challenges', []))}
+{challenges_block}
 
 DETAILED SECTION DATA WITH IMAGE PATHS:
 {company_sections_text}
 """
         
-        report_agent = AssistantAgent(
-            name="Investment_Analyst",
-            system_message=f"""You are a Senior Investment Analysis Specialist for {self.config['company_name']} (GMRAIRPORT.NS).
-
-YOUR ROLE: Provide investment analysis STATUS and key financial insights without generating files or images.
-
-Available data summary:
-{company_metrics}
-
-WHEN REQUESTED, PROVIDE ANALYSIS STATUS IN THIS FORMAT:
-
-🏦 INVESTMENT ANALYSIS STATUS:
-• Data Source: Available/Cached company analysis data
-• Analysis Type: Fundamental analysis with financial metrics
-• Status: COMPLETED
-
-💰 KEY FINANCIAL INSIGHTS:
-• Recommendation: [Extract from available data]
-• Revenue/EBITDA: [Key financial figures if available]
-• Debt Position: [Key debt metrics if available]
-• Operational Performance: [Key operational metrics if available]
-• Valuation: [Key valuation metrics if available]
-
-✅ KEY STRENGTHS:
-[List key strengths from available data]
-
-⚠️ KEY CHALLENGES:
-[List key challenges from available data]
-
-NOTE: Analysis is based on available cached data. No new files or reports generated.
-""",
-        **self.agent_llm_kwargs,
-    )
-        
-        # Read compliance findings and recommendation data
-        compliance_findings_file = self.data_dir / "compliance_findings.json"
-        
-        compliance_findings_raw = {}
-        if compliance_findings_file.exists():
-            with open(compliance_findings_file, 'r', encoding='utf-8') as f:
-                compliance_findings_raw = json.load(f)
+        investment_sysmsg = self._INVESTMENT_SYSMSG_TEMPLATE.format(
+            company=self.config['company_name'], symbol=self.config['stock_symbol'], metrics=company_metrics
+        )
         
-        compliance_recommendation_raw = {}
-        if compliance_recommendation_file.exists():
-            with open(compliance_recommendation_file, 'r', encoding='utf-8') as f:
-                compliance_recommendation_raw = json.load(f)
+        # Serialize each compliance section once, off the event loop, then combine them into one block
+        compliance_sections = {
+            "section_1_policy_rules": compliance_findings_raw.get('section_1_policy_rules', {}),
+            "section_2_trading_classification": compliance_findings_raw.get('section_2_trading_classification', {}),
+            "section_3_exceptional_events": compliance_findings_raw.get('section_3_exceptional_events', {}),
+            "section_4_final_recommendation": compliance_recommendation_raw.get('section_4_final_recommendation', {})
+        }
+        blobs = await asyncio.to_thread(_dump_sections, compliance_sections)
         
-        # Combine all compliance data
         compliance_full_data = f"""
 COMPLETE COMPLIANCE DATA:
 
 SECTION 1 - POLICY RULES:
-{json.dumps(compliance_findings_raw.get('section_1_policy_rules', {}), indent=2)}
+{blobs['section_1_policy_rules']}
 
 SECTION 2 - TRADING CLASSIFICATION:
-{json.dumps(compliance_findings_raw.get('section_2_trading_classification', {}), indent=2)}
+{blobs['section_2_trading_classification']}
 
 SECTION 3 - EXCEPTIONAL EVENTS:
-{json.dumps(compliance_findings_raw.get('section_3_exceptional_events', {}), indent=2)}
+{blobs['section_3_exceptional_events']}
 
 SECTION 4 - FINAL RECOMMENDATION:
-{json.dumps(compliance_recommendation_raw.get('section_4_final_recommendation', {}), indent=2)}
+{blobs['section_4_final_recommendation']}
 """
         
-        compliance_agent = AssistantAgent(
-            name="Compliance_Evaluator",
-            system_message=f"""You are a Senior Compliance Officer for PMS (Portfolio Management Services) evaluation of {self.config['company_name']} (GMRAIRPORT.NS).
-
-YOUR ROLE: Provide compliance evaluation STATUS and key decisions without generating files or reports.
-
-Available data summary:
-{compliance_full_data}
-
-WHEN REQUESTED, PROVIDE COMPLIANCE STATUS IN THIS FORMAT:
-
-⚖️ COMPLIANCE EVALUATION STATUS:
-• Data Source: Available/Cached compliance findings and recommendations
-• Evaluation Type: PMS compliance assessment
-• Status: COMPLETED
-
-🔍 COMPLIANCE FINDINGS:
-• Overall Decision: [Extract final recommendation if available]
-• Risk Level: [Extract risk assessment if available]
-• Trading Status: [Extract trading approval status if available]
-• Key Concerns: [List main compliance issues if available]
-• Mitigation Required: [List required actions if available]
-
-✅ FINAL RECOMMENDATION:
-[Extract the final compliance decision and reasoning from available data]
-
-NOTE: Evaluation is based on available cached data. No new compliance reports generated.
-""",
-        **self.agent_llm_kwargs,
-    )
-        
-        # User Proxy for orchestration
-        user_proxy = UserProxyAgent(
-            name="Analysis_Pipeline_Manager",
-            human_input_mode="NEVER",
-            max_consecutive_auto_reply=0,
-            code_execution_config=False
-        )
-        
-        agents = {
-            "stock": stock_agent,
-            "investment": report_agent,
-            "compliance": compliance_agent,
-            "user_proxy": user_proxy
+        system_messages = {
+            "stock": stock_sysmsg,
+            "investment": investment_sysmsg,
+            "compliance": self._COMPLIANCE_SYSMSG_TEMPLATE.format(
+                company=self.config['company_name'], symbol=self.config['stock_symbol'], metrics=compliance_full_data
+            )
         }
+        GMRInvestmentOrchestrator._agents_cache = (cache_key, system_messages)
         
+        agents = self._checkout_agents(AssistantAgent, UserProxyAgent, system_messages)
         print(f"✅ Created {len(agents)-1} AutoGen agents with GMR analysis data")
         return agents
     
     async def run_autogen_orchestration(self, agents: Dict[str, Any], progress_callback=None) -> Dict[str, Any]:
         """Run AutoGen multi-agent orchestration using GroupChatManager"""
         
-        if not AUTOGEN_AVAILABLE or not agents:
+        autogen_classes = _import_autogen()
+        if autogen_classes is None or not agents:
             return {"status": "skipped", "reason": "AutoGen not available"}
+        _, _, GroupChat, GroupChatManager = autogen_classes
         
         print("\n🤖 Starting AutoGen Multi-Agent Orchestration...")
-        print("="*80)
+        print(BANNER)
+        
+        # Reused agents still hold the previous run's chat history
+        for agent in agents.values():
+            agent.reset()
         
         try:
             # CREATE SINGLE GROUPCHAT WITH ALL AGENTS
@@ -505,7 +930,7 @@ CRITICAL RULES:
             
             # INITIATE GROUP CHAT
             print("\n💬 Starting Agent Conversation...")
-            print("-" * 80)
+            print(RULE)
             
             initial_message = """Please provide comprehensive investment analysis for GMR Airports Ltd.
 
@@ -520,14 +945,19 @@ Stock_Analyst: Please begin with your complete technical analysis."""
             def is_termination_msg(msg):
                 """Terminate after Compliance_Evaluator provides final verdict"""
                 try:
-                    content = msg.get("content", "")
-                    speaker = msg.get("name", "")
+                    content = msg.get("content") or ""
                     
-                    if speaker == "Compliance_Evaluator" and "FINAL COMPLIANCE VERDICT" in content:
+                    # Both verdict markers contain this phrase, so one scan rules out most messages
+                    verdict_at = content.find("FINAL COMPLIANCE VERDICT")
+                    if verdict_at < 0:
+                        return False
+                    
+                    if msg.get("name", "") == "Compliance_Evaluator":
                         print("\n✅ All 3 agents completed - terminating conversation")
                         return True
                     
-                    if "SECTION 4: FINAL COMPLIANCE VERDICT" in content:
+                    # Resume the search just before the first match rather than rescanning from the start
+                    if content.find("SECTION 4: FINAL COMPLIANCE VERDICT", max(0, verdict_at - len("SECTION 4: "))) >= 0:
                         print("\n✅ Compliance verdict received - terminating conversation")
                         return True
                     
@@ -557,11 +987,12 @@ Stock_Analyst: Please begin with your complete technical analysis."""
                     "framework": "AutoGen GroupChat"
                 }
             
-            print("\n\n" + "="*80)
-            print("✅ GroupChat conversation completed!")
-            print("="*80)
-            print(f"💬 Total messages: {len(group_chat.messages)}")
-            print(f"👥 Agents participated: {len([a for a in group_chat.agents if a.name != 'Analysis_Pipeline_Manager'])}")
+            # Emit the summary block in one record, formatted only if INFO is enabled
+            logger.info(
+                "\n\n%s\n✅ GroupChat conversation completed!\n%s\n💬 Total messages: %d\n👥 Agents participated: %d",
+                BANNER, BANNER, len(group_chat.messages),
+                sum(1 for a in group_chat.agents if a.name != 'Analysis_Pipeline_Manager')
+            )
             
             return {
                 "status": "completed",
@@ -579,6 +1010,8 @@ Stock_Analyst: Please begin with your complete technical analysis."""
                 "error": str(e),
                 "framework": "AutoGen (failed)"
             }
+        finally:
+            _IDLE_AGENT_SETS.append(agents)
     
     def _extract_investment_decision(self, messages: List) -> Dict[str, Any]:
         """Extract comprehensive analysis summary from AutoGen conversation"""
@@ -586,16 +1019,20 @@ Stock_Analyst: Please begin with your complete technical analysis."""
         compliance_statuses = []
         risk_profiles = []
         
-        for msg in messages:
-            if hasattr(msg, 'content') and msg.content:
-                content = msg.content
-                
-                import re
-                compliance_matches = re.findall(r'(?:APPROVED|COMPLIANT|CONDITIONAL|REVIEW REQUIRED|REJECTED|NON-COMPLIANT)', content.upper())
-                compliance_statuses.extend(compliance_matches)
-                
-                risk_matches = re.findall(r'(?:HIGH RISK|MODERATE RISK|LOW RISK)', content.upper())
-                risk_profiles.extend(risk_matches)
+        # GroupChat messages are dicts; tolerate message objects too
+        contents = [
+            (msg.get("content") if isinstance(msg, dict) else getattr(msg, "content", None)) or ""
+            for msg in messages
+        ]
+        
+        for content in contents:
+            if not content:
+                continue
+            for match in _DECISION_RE.finditer(content.upper()):
+                if match.lastgroup == "compliance":
+                    compliance_statuses.append(match.group())
+                else:
+                    risk_profiles.append(match.group())
         
         compliance = compliance_statuses[-1] if compliance_statuses else "UNKNOWN"
         risk_profile = risk_profiles[-1] if risk_profiles else "MODERATE RISK"
@@ -608,29 +1045,34 @@ Stock_Analyst: Please begin with your complete technical analysis."""
             "analysis_source": "AutoGen GroupChat"
         }
     
-    async def complete_orchestration(self, run_agents: bool = False) -> Dict[str, Any]:
+    async def complete_orchestration(self, run_agents: bool = False, progress_callback=None) -> Dict[str, Any]:
         """Execute complete investment analysis pipeline with AutoGen
         
         Args:
             run_agents: If True, run agent scripts to generate fresh data.
                        If False (default for deployment), use existing JSON files.
+            progress_callback: Optional ``async (event_type, agent, message)`` callable
+                       that receives agent log lines as they are produced.
         """
         start_time = datetime.now()
         
         print(f"\n🏢 COMPLETE GMR INVESTMENT ANALYSIS ORCHESTRATION")
         print(f"Company: {self.config['company_name']}")
         print(f"Stock: {self.config['stock_symbol']}")
-        print("="*80)
+        print(BANNER)
         
-        # Load existing data (cached) - default for deployment
-        print("\n📁 Loading existing JSON files (cached data)...")
-        agent_data = await self.load_existing_data()
+        if run_agents:
+            agent_data = await self.collect_agent_data(progress_callback)
+        else:
+            # Load existing data (cached) - default for deployment
+            print("\n📁 Loading existing JSON files (cached data)...")
+            agent_data = await self.load_existing_data()
         
         # Create AutoGen agents with collected data
         autogen_agents = await self.create_autogen_agents(agent_data)
         
         # Run AutoGen orchestration
-        orchestration_results = await self.run_autogen_orchestration(autogen_agents)
+        orchestration_results = await self.run_autogen_orchestration(autogen_agents, progress_callback)
         
         # Calculate processing time
         processing_time = (datetime.now() - start_time).total_seconds()
@@ -645,7 +1087,7 @@ Stock_Analyst: Please begin with your complete technical analysis."""
             "agent_data_collection": agent_data,
             "autogen_orchestration": orchestration_results,
             "system_status": {
-                "autogen_framework": "Available" if AUTOGEN_AVAILABLE else "Unavailable",
+                "autogen_framework": "Available" if _import_autogen() else "Unavailable",
                 "agents_executed": len([k for k, v in agent_data.items() if v.get("status") in ["success", "cached"]]),
                 "data_collected": True
             },
@@ -686,14 +1128,13 @@ Stock_Analyst: Please begin with your complete technical analysis."""
             "autogen_orchestration": results.get("autogen_orchestration", {}),
             "system_status": results.get("system_status", {}),
             "framework_validation": {
-                "autogen_framework": "Available" if AUTOGEN_AVAILABLE else "Unavailable",
+                "autogen_framework": "Available" if _import_autogen() else "Unavailable",
                 "agent_count": 3,
                 "azure_ai_integration": True
             }
         }
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        output_path.write_bytes(orjson.dumps(report, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
         return str(output_path)
 
@@ -720,5 +1161,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Run GMR investment analysis orchestration
     result = asyncio.run(main())
@@ -178,15 +178,24 @@ function HistoryPage() {
         setLoading(true)
         setError(null)
         
-        const response = await fetch(`${API_BASE_URL}/api/analyses`)
-        if (!response.ok) {
-          throw new Error(`Failed to fetch analyses: ${response.statusText}`)
-        }
-        
-        const data = await response.json()
+        // The API returns one page at a time; follow the continuation cursor to the end
+        const analyses: any[] = []
+        let continuation: string | null = null
+        do {
+          const params = new URLSearchParams({ limit: '1000' })
+          if (continuation) params.set('continuation', continuation)
+          const response = await fetch(`${API_BASE_URL}/api/analyses?${params}`)
+          if (!response.ok) {
+            throw new Error(`Failed to fetch analyses: ${response.statusText}`)
+          }
+          
+          const data = await response.json()
+          analyses.push(...data.analyses)
+          continuation = data.continuation
+        } while (continuation)
         
         // Transform API response to WorkflowRun format with GMR Airports data
-        const workflows: WorkflowRun[] = data.analyses.map((analysis: any) => ({
+        const workflows: WorkflowRun[] = analyses.map((analysis: any) => ({
           id: analysis.id,
           workflowId: analysis.workflowid || analysis.workflowId || analysis.id,
           company: analysis.companyName || 'GMR Airports Ltd',